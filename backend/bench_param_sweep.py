@@ -0,0 +1,43 @@
+import os
+import sys
+import time
+
+import numpy as np
+
+from core_engine.persistence import load_snapshot
+from core_engine.sweep import sweep_ntf, sweep_ops
+
+# Quét tham số OPS + NTF trên mọi core. Dữ liệu: snapshot Oracle (.oracle_cache) nếu có, không thì lợi nhuận giả lập.
+# Chạy: python bench_param_sweep.py [số_worker]
+
+CACHE_DIR = os.environ.get("ORACLE_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".oracle_cache"))
+
+def load_returns(min_length=500):
+    snapshot = load_snapshot(CACHE_DIR) if CACHE_DIR else None
+    if snapshot is not None:
+        store, _ = snapshot
+        cols = [t for t in store.tickers if store.length(t) >= min_length and not t.startswith("^")]
+        if len(cols) >= 5:
+            prices = np.column_stack([store.tail(t, min_length) for t in cols])
+            print(f"Snapshot Oracle: {len(cols)} mã × {min_length} phiên")
+            return prices[1:] / prices[:-1] - 1
+
+    print("Không có snapshot -> dùng lợi nhuận giả lập 60 mã × 750 phiên")
+    rng = np.random.default_rng(42)
+    factors = rng.normal(0.0003, 0.01, (750, 6))
+    return factors @ rng.uniform(0, 0.4, (6, 60)) + rng.normal(0, 0.012, (750, 60))
+
+if __name__ == "__main__":
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else os.cpu_count()
+    returns = load_returns()
+    groups = {i: i % 6 for i in range(returns.shape[1])}
+
+    start = time.perf_counter()
+    ops = sweep_ops(returns, np.geomspace(0.005, 1.0, 24), (0.0, 0.01, 0.05), groups, max_workers=workers)
+    print(f"\nOPS: {len(ops)} bộ tham số trong {time.perf_counter() - start:.1f}s ({workers} worker)")
+    print(ops.head(10).to_string(index=False))
+
+    start = time.perf_counter()
+    ntf = sweep_ntf(returns, (5, 10, 20, 60), (40, 60, 120), (5,), max_workers=workers)
+    print(f"\nNTF: {len(ntf)} bộ tham số trong {time.perf_counter() - start:.1f}s ({workers} worker)")
+    print(ntf.head(10).to_string(index=False))
@@ -0,0 +1,47 @@
+import time
+
+import numpy as np
+
+from core_engine.oracle_sources import default_universe
+from core_engine.providers import FakeProvider, HedgedProvider, RateLimiter
+
+# Benchmark tải nguội (cold start) cả rổ ngành bằng provider giả lập độ trễ:
+#  1. Tuần tự + sleep(1) như debug_vnstock_seq.py
+#  2. Song song có rate limit (token bucket) như VnstockProvider
+#  3. Provider chính có đuôi độ trễ dài (5% request treo 3s) - 1 request treo là cả lượt tải treo
+#  4. Như 3 nhưng hedged: quá hạn thì gửi phần còn thiếu sang provider dự phòng
+
+def heavy_tail(seed):
+    rng = np.random.default_rng(seed)
+    return lambda ticker: 3.0 if rng.random() < 0.05 else rng.uniform(0.02, 0.08)
+
+def sequential_with_sleep(provider, tickers):
+    for t in tickers:
+        provider.fetch(t, "1y")
+        time.sleep(1)
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+if __name__ == "__main__":
+    tickers = default_universe()
+    print(f"Rổ: {len(tickers)} mã")
+
+    vnstock_like = FakeProvider(latency=0.15, name="vnstock-like")
+    print(f"1. Tuần tự + sleep(1):           {timed(sequential_with_sleep, vnstock_like, tickers[:10]) * len(tickers) / 10:6.1f}s (ước tính từ 10 mã)")
+
+    limited = FakeProvider(latency=0.15, name="rate-limited", max_concurrency=4)
+    limited.rate_limiter = RateLimiter(rate=5, burst=5)
+    print(f"2. Song song, rate limit 5 req/s: {timed(limited.fetch_many, tickers, '1y'):6.1f}s")
+
+    runs = 5
+    plain, hedged = [], []
+    for seed in range(runs):
+        plain.append(timed(FakeProvider(latency=heavy_tail(seed), name="primary").fetch_many, tickers, "1y"))
+        provider = HedgedProvider(FakeProvider(latency=heavy_tail(seed), name="primary"),
+                                  FakeProvider(latency=0.05, name="backup"), hedge_after=0.5)
+        hedged.append(timed(provider.fetch_many, tickers, "1y"))
+    print(f"3. Provider chính (đuôi dài):     trung bình {np.mean(plain):5.2f}s | max {np.max(plain):5.2f}s")
+    print(f"4. Hedged (sau 0.5s):             trung bình {np.mean(hedged):5.2f}s | max {np.max(hedged):5.2f}s")
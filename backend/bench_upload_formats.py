@@ -0,0 +1,49 @@
+import json
+import time
+import numpy as np
+
+from core_engine.price_store import PriceStore
+from core_engine import matrix_codec
+
+# So sánh payload JSON (dict-of-lists) và nhị phân QMX1 cho /api/upload-oracle:
+# kích thước payload + thời gian encode (phía Colab) + parse vào PriceStore (phía Server)
+
+def make_prices(n_rows, n_tickers, seed=42):
+    rng = np.random.default_rng(seed)
+    matrix = 20000 * np.exp(np.cumsum(rng.normal(0, 0.02, (n_rows, n_tickers)), axis=0))
+    tickers = [f"T{i:03d}.VN" for i in range(n_tickers)]
+    return tickers, matrix
+
+def best_of(fn, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def bench(n_rows, n_tickers):
+    tickers, matrix = make_prices(n_rows, n_tickers)
+
+    # JSON: đúng dạng {"data": {ticker: [...]}} mà Server đang nhận
+    data = {t: matrix[:, j].tolist() for j, t in enumerate(tickers)}
+    json_body = json.dumps({"data": data}).encode()
+    t_json_enc = best_of(lambda: json.dumps({"data": data}).encode())
+    t_json_parse = best_of(lambda: PriceStore.from_dict(json.loads(json_body)["data"]))
+
+    bin_body = matrix_codec.encode_matrix(tickers, matrix)
+    t_bin_enc = best_of(lambda: matrix_codec.encode_matrix(tickers, matrix))
+    def parse_binary():
+        tickers_, matrix_, lengths_ = matrix_codec.decode_matrix(bin_body)
+        return PriceStore(matrix_, tickers_, lengths_)
+    t_bin_parse = best_of(parse_binary)
+
+    print(f"--- {n_rows} phiên × {n_tickers} mã ---")
+    print(f"JSON  : {len(json_body) / 1024:9.1f} KB | encode {t_json_enc * 1000:8.2f} ms | parse {t_json_parse * 1000:8.2f} ms")
+    print(f"QMX1  : {len(bin_body) / 1024:9.1f} KB | encode {t_bin_enc * 1000:8.2f} ms | parse {t_bin_parse * 1000:8.2f} ms")
+    print(f"Tỷ lệ : size x{len(json_body) / len(bin_body):.1f} | parse x{t_json_parse / t_bin_parse:.0f}")
+
+if __name__ == "__main__":
+    bench(252, 31)      # VN30 + benchmark, 1 năm
+    bench(252, 65)      # Các rổ ngành RRG_*.txt
+    bench(1260, 400)    # Toàn sàn HOSE, 5 năm
@@ -0,0 +1,53 @@
+import numpy as np
+
+from core_engine.rrg_engine import RRG_WINDOW
+
+# Độ rộng thị trường (market breadth) cho cả rổ trong 1 lượt ma trận - chỉ đọc các hàng cuối của kho giá.
+BREADTH_MA_WINDOWS = (20, 50, 200)
+HIGH_LOW_WINDOW = 252   # Đỉnh/đáy mới: so với 52 tuần (hoặc toàn bộ lịch sử nếu ngắn hơn)
+
+def _ratio(count, total):
+    return round(count / total, 4) if total else None
+
+def compute_breadth(matrix, cols, bench_col=None, ma_windows=BREADTH_MA_WINDOWS, high_low_window=HIGH_LOW_WINDOW):
+    """
+    Args:
+        matrix (np.array): Ma trận giá (T, N) căn lề phải, phiên thiếu = NaN.
+        cols (list): Cột của các mã trong rổ (đã bỏ chỉ số).
+        bench_col (int): Cột benchmark cho độ rộng RS (None = bỏ qua).
+
+    Returns:
+        dict: universe, above_ma {"ma20": tỷ lệ, ...} (mẫu số = mã đủ lịch sử cho từng MA),
+        advances / declines / unchanged / ad_ratio, new_highs / new_lows,
+        rs_above_100 (tỷ lệ mã có RS trung bình 10 phiên > 100, như breadth_t1 của Colab).
+    """
+    n = len(cols)
+    result = {"universe": n}
+    if n == 0 or len(matrix) < 2:
+        return result
+    last = matrix[-1, cols]
+
+    above_ma = {}
+    for window in ma_windows:
+        ma = matrix[-window:, cols].mean(axis=0) if len(matrix) >= window else np.full(n, np.nan)
+        valid = ~np.isnan(ma)
+        above_ma[f"ma{window}"] = _ratio(int(np.count_nonzero(last[valid] > ma[valid])), int(np.count_nonzero(valid)))
+    result["above_ma"] = above_ma
+
+    change = last - matrix[-2, cols]
+    advances, declines = int(np.count_nonzero(change > 0)), int(np.count_nonzero(change < 0))
+    result.update({
+        "advances": advances, "declines": declines,
+        "unchanged": int(np.count_nonzero(change == 0)),
+        "ad_ratio": round(advances / declines, 4) if declines else None,
+    })
+
+    with np.errstate(all="ignore"):
+        window = matrix[-high_low_window:, cols]
+        result["new_highs"] = int(np.count_nonzero(last >= np.nanmax(window, axis=0)))
+        result["new_lows"] = int(np.count_nonzero(last <= np.nanmin(window, axis=0)))
+
+        if bench_col is not None:
+            rs = 100 * matrix[-RRG_WINDOW:, cols] / matrix[-RRG_WINDOW:, bench_col][:, None]
+            result["rs_above_100"] = _ratio(int(np.count_nonzero(rs.mean(axis=0) > 100)), n)
+    return result
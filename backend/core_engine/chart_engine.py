@@ -0,0 +1,111 @@
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from core_engine.ttl_cache import TTLLRUCache
+
+# Biểu đồ OHLCV + Volume Profile (POC) dựng sẵn phía Server: dữ liệu rút gọn theo ngân sách điểm,
+# client chỉ nhận mảng số (không phải Plotly JSON) -> chart nhiều năm vẫn nhẹ.
+CHART_RANGES = {"1mo", "3mo", "6mo", "ytd", "1y", "2y", "5y", "10y", "max"}
+DEFAULT_BINS = 50
+DEFAULT_POINTS = 500
+MIN_POINTS, MAX_POINTS = 50, 2000
+MIN_BINS, MAX_BINS = 10, 200
+
+def bucket_ohlc(dates, ohlcv, max_points):
+    """
+    Gộp các phiên liên tiếp thành tối đa max_points nến (OHLC bucketing):
+    open = đầu giỏ, high = max, low = min, close = cuối giỏ, volume = tổng, ngày = phiên đầu giỏ.
+    Giữ nguyên đỉnh/đáy thật (LTTB chỉ hợp với 1 chuỗi giá, làm mất biên độ nến).
+    ohlcv: ma trận (T, 5) theo thứ tự open, high, low, close, volume. Trả về (dates, ohlcv, số phiên mỗi giỏ).
+    """
+    n = len(ohlcv)
+    size = max(1, -(-n // max_points))
+    if size == 1:
+        return dates, ohlcv, 1
+    # Giỏ tính từ phiên mới nhất -> giỏ cuối luôn đủ và kết thúc đúng phiên hiện tại
+    starts = np.arange((n - 1) % size + 1 - size, n, size).clip(min=0)
+    out = np.column_stack([
+        ohlcv[starts, 0],
+        np.maximum.reduceat(ohlcv[:, 1], starts),
+        np.minimum.reduceat(ohlcv[:, 2], starts),
+        ohlcv[np.append(starts[1:], n) - 1, 3],
+        np.add.reduceat(ohlcv[:, 4], starts),
+    ])
+    return dates[starts], out, size
+
+def volume_profile(ohlcv, bins=DEFAULT_BINS):
+    """
+    Volume theo vùng giá trên TOÀN BỘ phiên (trước khi rút gọn), giống calculate_volume_profile của debug_chart.py:
+    chia [low min, high max] thành `bins` giỏ, cộng volume của mỗi phiên vào giỏ chứa giá đóng cửa.
+    Trả về (giá giữa mỗi giỏ, volume mỗi giỏ, POC = giá giữa của giỏ nhiều volume nhất).
+    """
+    edges = np.linspace(np.nanmin(ohlcv[:, 2]), np.nanmax(ohlcv[:, 1]), bins + 1)
+    hist, _ = np.histogram(ohlcv[:, 3], bins=edges, weights=ohlcv[:, 4])
+    mids = (edges[:-1] + edges[1:]) / 2
+    return mids, hist, float(mids[hist.argmax()])
+
+def chart_payload(ticker, period, frame, bins=DEFAULT_BINS, max_points=DEFAULT_POINTS):
+    ohlcv = frame[["open", "high", "low", "close", "volume"]].to_numpy(dtype=np.float64)
+    # Phiên không có giá đóng cửa bị bỏ; volume thiếu = 0 -> không có NaN trong histogram/POC lẫn JSON
+    keep = np.isfinite(ohlcv[:, 3])
+    ohlcv, frame = ohlcv[keep], frame[keep]
+    ohlcv[:, :3] = np.where(np.isfinite(ohlcv[:, :3]), ohlcv[:, :3], ohlcv[:, 3:4])  # open/high/low thiếu = close
+    ohlcv[:, 4] = np.nan_to_num(ohlcv[:, 4], nan=0.0, posinf=0.0, neginf=0.0)
+    if len(ohlcv) < 2:
+        return {"ticker": ticker, "range": period, "bars": len(ohlcv), "dates": []}
+    mids, hist, poc = volume_profile(ohlcv, bins)
+    dates, candles, bucket = bucket_ohlc(np.asarray(frame.index.strftime("%Y-%m-%d")), ohlcv, max_points)
+    candles = np.round(candles, 2)
+    return {
+        "ticker": ticker, "range": period,
+        "bars": len(ohlcv),          # Số phiên gốc
+        "bucket": bucket,            # Số phiên gộp vào mỗi nến
+        "dates": dates.tolist(),
+        "open": candles[:, 0].tolist(), "high": candles[:, 1].tolist(),
+        "low": candles[:, 2].tolist(), "close": candles[:, 3].tolist(),
+        "volume": candles[:, 4].tolist(),
+        "profile": {"price": np.round(mids, 2).tolist(), "volume": hist.tolist()},
+        "poc": round(poc, 2),
+    }
+
+
+class ChartService:
+    """
+    Chart OHLCV + Volume Profile theo (ticker, range, bins, points), cache bytes JSON đã encode (TTL + LRU).
+    - OHLCV gốc cache riêng theo (ticker, range): đổi bins/points không tải lại.
+    - Single-flight: nhiều request cùng key chỉ dựng 1 lần; tải + tính chạy trong thread pool.
+    """
+
+    def __init__(self, provider, max_workers=2, cache_max_bytes=16 * 1024 * 1024, cache_ttl=300):
+        self.provider = provider
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="chart")
+        self._inflight = {}
+        self.cache = TTLLRUCache(cache_max_bytes, cache_ttl)
+
+    async def get(self, ticker, period="1y", bins=DEFAULT_BINS, max_points=DEFAULT_POINTS):
+        key = (ticker, period, bins, max_points)
+        body = self.cache.get(key)
+        if body is not None:
+            return body
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(asyncio.get_running_loop().run_in_executor(self._executor, self._build, key))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+    def _build(self, key):
+        ticker, period, bins, max_points = key
+        frame = self.cache.get(("ohlcv", ticker, period))
+        if frame is None:
+            frame = self.provider.fetch(ticker, period)
+            if len(frame):
+                self.cache.put(("ohlcv", ticker, period), frame, int(frame.memory_usage(index=True).sum()))
+        body = json.dumps(chart_payload(ticker, period, frame, bins, max_points), allow_nan=False).encode("utf-8")
+        if len(frame) >= 2:
+            self.cache.put(key, body)
+        return body
@@ -0,0 +1,106 @@
+import numpy as np
+
+# Bộ feature kỹ thuật cho AI Oracle (đúng thứ tự cột của train_dummy_model.py), tính cho cả rổ mã cùng lúc.
+# Kho chỉ có giá đóng cửa -> Vol_Ratio là proxy theo giá: độ biến động 5 phiên / 20 phiên (không phải khối lượng).
+FEATURE_COLUMNS = ["RSI", "Dist_SMA20", "MACD_Hist", "BB_PctB", "Vol_Ratio", "Vol_20", "BandWidth"]
+
+RSI_WINDOW = 14
+BB_WINDOW = 20
+BB_STD = 2.0
+MACD_FAST, MACD_SLOW, MACD_SIGNAL = 12, 26, 9
+VOL_SHORT, VOL_LONG = 5, 20
+MIN_HISTORY = MACD_SLOW + MACD_SIGNAL  # Số phiên tối thiểu để mọi feature có nghĩa
+WARMUP_ROWS = 250  # EMA/RSI khởi động từ 250 phiên cuối: sai khác tương đối so với chạy từ đầu cỡ 1e-6
+
+def _ema_step(ema, x, alpha):
+    # EMA kiểu ewm(adjust=False): bắt đầu từ giá trị hợp lệ đầu tiên; x = NaN -> giữ nguyên
+    started = np.where(np.isnan(ema), x, ema + alpha * (x - ema))
+    return np.where(np.isnan(x), ema, started)
+
+
+class FeatureState:
+    """
+    Feature phiên mới nhất của mọi mã + trạng thái chạy (EMA, RSI Wilder, cửa sổ giá gần nhất).
+    - Khởi tạo: quét WARMUP_ROWS hàng cuối của ma trận, mỗi bước là phép toán vector trên N mã.
+    - push(row): nhận 1 phiên mới, O(N); feature mới nhất tính sẵn -> mỗi request chỉ đọc 1 hàng.
+    - replace_last(row): phiên mới nhất được gửi lại (giá trong phiên) -> quay về trạng thái trước phiên đó rồi tính lại.
+    """
+
+    def __init__(self, matrix):
+        n = matrix.shape[1]
+        history = matrix[-WARMUP_ROWS:]
+        self.window = np.full((VOL_LONG + 1, n), np.nan)  # VOL_LONG + 1 giá cuối (-> VOL_LONG lợi nhuận)
+        self.count = np.zeros(n, dtype=np.int64)           # Số phiên có giá đã nhận (tối đa theo history)
+        self.ema_fast = np.full(n, np.nan)
+        self.ema_slow = np.full(n, np.nan)
+        self.macd_signal = np.full(n, np.nan)
+        self.avg_gain = np.full(n, np.nan)
+        self.avg_loss = np.full(n, np.nan)
+        self.values = np.full((n, len(FEATURE_COLUMNS)), np.nan)
+
+        with np.errstate(all="ignore"):
+            for row in history:
+                self._step(row)
+            self._refresh()
+
+    def _step(self, row):
+        # Trạng thái trước bước này (mảng được gán mới mỗi bước, riêng count cộng tại chỗ -> copy)
+        self._before_last = (self.window, self.count.copy(), self.ema_fast, self.ema_slow,
+                             self.macd_signal, self.avg_gain, self.avg_loss)
+        prev = self.window[-1]
+        delta = row - prev
+        self.window = np.vstack([self.window[1:], row])
+        self.count += ~np.isnan(row)
+
+        self.ema_fast = _ema_step(self.ema_fast, row, 2 / (MACD_FAST + 1))
+        self.ema_slow = _ema_step(self.ema_slow, row, 2 / (MACD_SLOW + 1))
+        self.macd_signal = _ema_step(self.macd_signal, self.ema_fast - self.ema_slow, 2 / (MACD_SIGNAL + 1))
+        # RSI Wilder = EMA alpha 1/14 của phần tăng / phần giảm
+        self.avg_gain = _ema_step(self.avg_gain, np.maximum(delta, 0.0), 1 / RSI_WINDOW)
+        self.avg_loss = _ema_step(self.avg_loss, np.maximum(-delta, 0.0), 1 / RSI_WINDOW)
+
+    def _refresh(self):
+        last = self.window[-1]
+        closes = self.window[-BB_WINDOW:]
+        sma = closes.mean(axis=0)
+        std = closes.std(axis=0, ddof=1)
+        upper, lower = sma + BB_STD * std, sma - BB_STD * std
+
+        returns = self.window[1:] / self.window[:-1] - 1
+        vol_long = returns.std(axis=0, ddof=1)
+        vol_short = returns[-VOL_SHORT:].std(axis=0, ddof=1)
+
+        macd = self.ema_fast - self.ema_slow
+        rsi = 100 - 100 / (1 + self.avg_gain / self.avg_loss)
+        rsi = np.where(self.avg_loss == 0, 100.0, rsi)
+
+        values = np.column_stack([
+            rsi,
+            last / sma - 1,
+            macd - self.macd_signal,
+            (last - lower) / (upper - lower),
+            vol_short / vol_long,
+            vol_long,
+            (upper - lower) / sma,
+        ])
+        values[self.count < MIN_HISTORY] = np.nan
+        self.values = values
+
+    def push(self, row):
+        """Cập nhật với 1 phiên mới (N,) - O(N)."""
+        with np.errstate(all="ignore"):
+            self._step(row)
+            self._refresh()
+
+    def replace_last(self, row):
+        """Thay phiên mới nhất bằng row (N,) - O(N)."""
+        (self.window, self.count, self.ema_fast, self.ema_slow,
+         self.macd_signal, self.avg_gain, self.avg_loss) = self._before_last
+        self.push(row)
+
+    def row(self, col):
+        """{feature: giá trị} phiên mới nhất của 1 mã; None nếu chưa đủ MIN_HISTORY phiên (hoặc giá đứng yên cả cửa sổ)."""
+        values = self.values[col]
+        if np.isnan(values).any():
+            return None
+        return dict(zip(FEATURE_COLUMNS, values.tolist()))
@@ -0,0 +1,99 @@
+import numpy as np
+
+from core_engine.rrg_engine import RRG_WINDOW, compute_rrg
+
+PULSE_MA_WINDOW = 20
+
+class RollingWindowSum:
+    """
+    Tổng trượt theo cửa sổ cho N cột, cập nhật O(N) mỗi phiên bằng ring buffer.
+    Giá trị trung bình chỉ hợp lệ khi cửa sổ đủ `window` ô không NaN (giống rolling(window).mean()).
+    """
+
+    def __init__(self, history, window):
+        self.window = window
+        buf = np.array(history[-window:], dtype=np.float64, ndmin=2)
+        if len(buf) < window:
+            buf = np.vstack([np.full((window - len(buf), buf.shape[1]), np.nan), buf])
+        self.buffer = buf
+        self.pos = 0  # Vị trí phiên cũ nhất trong ring buffer
+
+        valid = ~np.isnan(buf)
+        self.sum = np.where(valid, buf, 0.0).sum(axis=0)
+        self.count = valid.sum(axis=0)
+
+    def push(self, row):
+        self._swap(self.pos, row)
+        self.pos = (self.pos + 1) % self.window
+
+    def replace_last(self, row):
+        """Thay giá trị phiên mới nhất (ô pos-1) thay vì đẩy thêm phiên - O(N)."""
+        self._swap((self.pos - 1) % self.window, row)
+
+    def _swap(self, slot, row):
+        old = self.buffer[slot]
+        old_valid = ~np.isnan(old)
+        new_valid = ~np.isnan(row)
+
+        self.sum += np.where(new_valid, row, 0.0) - np.where(old_valid, old, 0.0)
+        self.count += new_valid.astype(np.int64) - old_valid.astype(np.int64)
+
+        self.buffer[slot] = row
+
+    def mean(self, cols=None):
+        s = self.sum if cols is None else self.sum[cols]
+        c = self.count if cols is None else self.count[cols]
+        return np.where(c == self.window, s / self.window, np.nan)
+
+
+class OracleState:
+    """
+    Trạng thái chạy (running state) cho RRG và Pulse để nhận phiên mới mà không tính lại từ đầu.
+    - rs_window: tổng trượt 10 phiên của RS (mẫu số của RS_Ratio).
+    - rs_ratio: RS_Ratio phiên mới nhất; prev_rs_ratio: RS_Ratio phiên trước đó (để tính lại RS_Momentum khi ghi đè phiên cuối).
+    - ma20: tổng trượt 20 phiên của giá (Pulse & AI Oracle).
+    """
+
+    def __init__(self, matrix, bench_col=None):
+        self.bench_col = bench_col
+        n = matrix.shape[1]
+
+        self.ma20 = RollingWindowSum(matrix, PULSE_MA_WINDOW)
+
+        if bench_col is None:
+            self.rs_window = None
+            self.rs_ratio = np.full(n, np.nan)
+            self.prev_rs_ratio = np.full(n, np.nan)
+            self.rs_momentum = np.full(n, np.nan)
+            return
+
+        bench = matrix[:, bench_col]
+        self.rs_window = RollingWindowSum(100 * (matrix[-RRG_WINDOW:] / bench[-RRG_WINDOW:, None]), RRG_WINDOW)
+        rs_ratio, rs_momentum = compute_rrg(matrix, bench, tail=2)
+        self.prev_rs_ratio = rs_ratio[-2]
+        self.rs_ratio = rs_ratio[-1]
+        self.rs_momentum = rs_momentum[-1]
+
+    def push(self, row):
+        """Cập nhật trạng thái với 1 phiên mới (N,) - O(N)."""
+        self.ma20.push(row)
+        if self.bench_col is None:
+            return
+
+        rs = 100 * (row / row[self.bench_col])
+        self.rs_window.push(rs)
+        self.prev_rs_ratio = self.rs_ratio
+        rs_ratio = (rs / self.rs_window.mean()) * 100
+        self.rs_momentum = (rs_ratio / self.prev_rs_ratio) * 100
+        self.rs_ratio = rs_ratio
+
+    def replace_last(self, row):
+        """Phiên mới nhất được cập nhật lại (giá trong phiên): thay đóng góp cũ của nó, không thêm phiên - O(N)."""
+        self.ma20.replace_last(row)
+        if self.bench_col is None:
+            return
+
+        rs = 100 * (row / row[self.bench_col])
+        self.rs_window.replace_last(rs)
+        self.rs_ratio = (rs / self.rs_window.mean()) * 100
+        self.rs_momentum = (self.rs_ratio / self.prev_rs_ratio) * 100
@@ -0,0 +1,112 @@
+import json
+import numpy as np
+
+from core_engine.price_store import PriceStore
+
+class PriceStoreBuilder:
+    """
+    Dựng PriceStore từng mảnh (chunk) thay vì giữ toàn bộ payload trong RAM.
+    - Có header (tickers + n_rows): cấp phát sẵn ma trận, mỗi chunk ghi thẳng vào cột -> đỉnh RAM ~ 1 ma trận.
+    - Không có header: gom chunk float64 theo mã rồi ghép 1 lần khi build().
+    Chunk của cùng 1 mã phải đến theo thứ tự thời gian (cũ -> mới).
+    """
+
+    def __init__(self, tickers=None, n_rows=None):
+        self._parts = {}
+        self._matrix = None
+        if tickers and n_rows:
+            self.header(tickers, n_rows)
+
+    def header(self, tickers, n_rows):
+        if self._parts or self._matrix is not None:
+            raise ValueError("Header phải đứng trước mọi chunk dữ liệu.")
+        self._tickers = list(tickers)
+        self._index = {t: j for j, t in enumerate(self._tickers)}
+        self._matrix = np.full((int(n_rows), len(self._tickers)), np.nan, dtype=np.float64)
+        self._cursor = np.zeros(len(self._tickers), dtype=np.int64)
+
+    def add_chunk(self, ticker, values):
+        values = np.asarray(values, dtype=np.float64)
+        if self._matrix is None:
+            self._parts.setdefault(ticker, []).append(values)
+            return
+
+        j = self._index.get(ticker)
+        if j is None:
+            raise ValueError(f"Mã {ticker} không có trong header.")
+        start = self._cursor[j]
+        if start + len(values) > self._matrix.shape[0]:
+            raise ValueError(f"Mã {ticker} vượt quá n_rows khai báo trong header.")
+        self._matrix[start:start + len(values), j] = values
+        self._cursor[j] = start + len(values)
+
+    def add_rows(self, tickers, rows):
+        """Chunk dạng cột-batch: rows (k, m) ứng với m mã trong tickers."""
+        rows = np.array(rows, dtype=np.float64, ndmin=2)
+        for i, t in enumerate(tickers):
+            self.add_chunk(t, rows[:, i])
+
+    def build(self):
+        if self._matrix is None:
+            tickers = list(self._parts.keys())
+            n_rows = max((sum(len(c) for c in chunks) for chunks in self._parts.values()), default=0)
+            matrix = np.full((n_rows, len(tickers)), np.nan, dtype=np.float64)
+            lengths = np.zeros(len(tickers), dtype=np.int64)
+            for j, t in enumerate(tickers):
+                # Ghép từng mã rồi giải phóng chunk ngay để không nhân đôi RAM
+                column = np.concatenate(self._parts.pop(t)) if self._parts[t] else np.empty(0)
+                matrix[n_rows - len(column):, j] = column
+                lengths[j] = len(column)
+            return PriceStore(matrix, tickers, lengths)
+
+        # Chế độ header: cột nào chưa đủ n_rows thì dời xuống để căn lề phải (phiên mới nhất ở hàng cuối)
+        matrix, n_rows = self._matrix, self._matrix.shape[0]
+        for j in np.flatnonzero(self._cursor < n_rows):
+            c = self._cursor[j]
+            matrix[n_rows - c:, j] = matrix[:c, j].copy()
+            matrix[:n_rows - c, j] = np.nan
+        return PriceStore(matrix, self._tickers, self._cursor.copy())
+
+
+class NDJSONIngestor:
+    """
+    Parser NDJSON tăng dần: nhận từng khúc bytes của request stream, chỉ giữ 1 dòng dở dang trong RAM.
+    Mỗi dòng là 1 trong các bản ghi:
+        {"tickers": [...], "n_rows": T}          -> header (tùy chọn, nên gửi đầu tiên)
+        {"ticker": "HPG.VN", "prices": [...]}     -> chunk 1 mã
+        {"tickers": [...], "rows": [[...], ...]}  -> chunk cột-batch (k phiên × m mã)
+    """
+
+    def __init__(self):
+        self.builder = PriceStoreBuilder()
+        self._pending = b""
+        self.records = 0
+
+    def feed(self, chunk):
+        data = self._pending + chunk
+        lines = data.split(b"\n")
+        self._pending = lines.pop()
+        for line in lines:
+            self._handle(line)
+
+    def close(self):
+        if self._pending:
+            self._handle(self._pending)
+            self._pending = b""
+        return self.builder.build()
+
+    def _handle(self, line):
+        line = line.strip()
+        if not line:
+            return
+        record = json.loads(line)
+        self.records += 1
+
+        if "ticker" in record:
+            self.builder.add_chunk(record["ticker"], record["prices"])
+        elif "rows" in record:
+            self.builder.add_rows(record["tickers"], record["rows"])
+        elif "n_rows" in record:
+            self.builder.header(record["tickers"], record["n_rows"])
+        else:
+            raise ValueError(f"Bản ghi NDJSON không hợp lệ (dòng {self.records}).")
@@ -0,0 +1,55 @@
+import json
+import struct
+import numpy as np
+
+# Định dạng nhị phân gọn cho ma trận giá (thay cho JSON khi upload từ Colab):
+#   [4 byte magic "QMX1"][uint32 LE: độ dài header][header JSON utf-8][đệm 0 tới bội số 8][float64 LE, C-order (n_rows × N)]
+# Header: {"tickers": [...], "n_rows": T, "dtype": "<f8"} (+ "lengths", "extra" tùy chọn)
+MAGIC = b"QMX1"
+CONTENT_TYPE = "application/x-quant-matrix"
+_PREFIX = struct.Struct("<4sI")
+
+def encode_header(tickers, n_rows, lengths=None, extra=None):
+    """Phần đầu payload (magic + header + đệm), ma trận float64 ghi ngay sau đó."""
+    header = {"tickers": list(tickers), "n_rows": int(n_rows), "dtype": "<f8"}
+    if lengths is not None:
+        header["lengths"] = [int(x) for x in lengths]
+    if extra is not None:
+        header["extra"] = extra  # Dữ liệu kèm theo (VD: cache dẫn xuất khi phát hành qua shared memory)
+    header_bytes = json.dumps(header).encode("utf-8")
+
+    offset = _PREFIX.size + len(header_bytes)
+    padding = (-offset) % 8
+    return b"".join([
+        _PREFIX.pack(MAGIC, len(header_bytes) + padding),
+        header_bytes,
+        b" " * padding,  # Đệm bằng khoảng trắng để header vẫn là JSON hợp lệ
+    ])
+
+def encode_matrix(tickers, matrix, lengths=None):
+    matrix = np.ascontiguousarray(matrix, dtype="<f8")
+    return encode_header(tickers, matrix.shape[0], lengths) + matrix.tobytes()
+
+def read_header(buf):
+    """Trả về (header dict, offset bắt đầu ma trận)."""
+    magic, header_len = _PREFIX.unpack_from(buf, 0)
+    if magic != MAGIC:
+        raise ValueError("Payload nhị phân không đúng định dạng QMX1.")
+    header = json.loads(bytes(buf[_PREFIX.size:_PREFIX.size + header_len]))
+    return header, _PREFIX.size + header_len
+
+def decode_matrix(buf):
+    """
+    Giải mã payload nhị phân -> (tickers, matrix, lengths).
+    matrix là view trực tiếp trên buf (zero-copy, chỉ đọc nếu buf là bytes).
+    """
+    header, offset = read_header(buf)
+
+    tickers = header["tickers"]
+    n_rows = header["n_rows"]
+    count = n_rows * len(tickers)
+    if len(buf) - offset < count * 8:
+        raise ValueError("Payload nhị phân bị cắt cụt.")
+
+    matrix = np.frombuffer(buf, dtype=header.get("dtype", "<f8"), count=count, offset=offset)
+    return tickers, matrix.reshape(n_rows, len(tickers)), header.get("lengths")
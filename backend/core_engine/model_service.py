@@ -0,0 +1,68 @@
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from core_engine.features import FEATURE_COLUMNS
+
+# Phục vụ model AI Oracle (quant_ai_model.pkl do train_dummy_model.py tạo): nạp 1 lần, chấm điểm cả rổ 1 lượt.
+DEFAULT_MODEL_PATH = os.environ.get(
+    "AI_MODEL_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "quant_ai_model.pkl")
+)
+BULLISH_THRESHOLD = 0.55   # Cùng ngưỡng GREED/FEAR của Market Pulse
+BEARISH_THRESHOLD = 0.45
+
+def signal_label(proba):
+    if proba >= BULLISH_THRESHOLD: return "Bullish"
+    if proba <= BEARISH_THRESHOLD: return "Bearish"
+    return "Neutral"
+
+
+class ModelService:
+    """
+    Nạp model lười 1 lần (lần chấm điểm đầu tiên), giữ trong process.
+    Không dùng mmap_mode: Tree.__setstate__ của sklearn copy mảng node/value vào buffer riêng nên RandomForest
+    không được chia sẻ page giữa các worker - mỗi worker uvicorn giữ 1 bản model.
+    Không có file / lỗi nạp -> ghi nhận load_error, predict() trả về {} (API lùi về "Neutral"), không thử lại mỗi request.
+    """
+
+    def __init__(self, path=DEFAULT_MODEL_PATH, feature_columns=FEATURE_COLUMNS):
+        self.path = os.path.abspath(path)
+        self.feature_columns = list(feature_columns)
+        self._model = None
+        self._loaded = False
+        self._lock = threading.Lock()
+        self.load_error = None
+        self.batches = 0
+
+    def model(self):
+        with self._lock:
+            if not self._loaded:
+                self._loaded = True
+                try:
+                    import joblib
+                    self._model = joblib.load(self.path)
+                except Exception as e:
+                    self.load_error = f"{type(e).__name__}: {e}"
+                    print(f"AI model không nạp được ({self.path}): {self.load_error}")
+            return self._model
+
+    def predict(self, features, labels):
+        """
+        features: ma trận (N, len(feature_columns)) phiên mới nhất; labels: tên N mã.
+        1 lượt predict_proba cho mọi mã đủ feature -> {mã: xác suất lớp TĂNG (lớp 1)}.
+        """
+        model = self.model()
+        if model is None:
+            return {}
+        valid = np.flatnonzero(np.isfinite(features).all(axis=1))
+        if len(valid) == 0:
+            return {}
+        frame = pd.DataFrame(features[valid], columns=self.feature_columns)
+        proba = model.predict_proba(frame)[:, list(model.classes_).index(1)]
+        self.batches += 1
+        return {labels[i]: float(p) for i, p in zip(valid, proba)}
+
+    def status(self):
+        return {"path": self.path, "loaded": self._model is not None, "error": self.load_error, "batches": self.batches}
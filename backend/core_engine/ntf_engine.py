@@ -1,12 +1,32 @@
 import numpy as np
+import pandas as pd
 
 def calculate_dynamic_network_momentum(assets_returns, lookback_window):
     """
-    1. Tính ma trận tương quan động (DCC-GARCH/Rolling Correlation).
+    1. Tính ma trận tương quan (toàn giai đoạn; bản trượt theo thời gian: rolling_network_momentum).
     2. Xây dựng đồ thị bằng cách lọc (VD: MST).
     3. Tính Momentum Spillover.
     """
     
+    # B1 + B2: Momentum cá nhân, Network và ma trận kề có trọng số W
+    momentum_df, spillover = _build_network_momentum(assets_returns, lookback_window)
+    
+    # B3: Momentum Spillover phiên cuối = 1 phép nhân W × vector momentum
+    final_signal = spillover.apply(momentum_df.values[-1])
+    return dict(zip(assets_returns.columns.tolist(), final_signal))
+
+
+def calculate_dynamic_network_momentum_series(assets_returns, lookback_window):
+    """
+    Như calculate_dynamic_network_momentum nhưng trả về TOÀN BỘ chuỗi tín hiệu (T × N) để backtest.
+    Lưu ý: Network dựng từ tương quan toàn giai đoạn (giống bản 1 phiên).
+    """
+    momentum_df, spillover = _build_network_momentum(assets_returns, lookback_window)
+    signals = spillover.apply(momentum_df.values)
+    return pd.DataFrame(signals, index=momentum_df.index, columns=momentum_df.columns)
+
+
+def _build_network_momentum(assets_returns, lookback_window):
     # B1: Tính Momentum Cá nhân (Signal S_i)
     momentum_df = assets_returns.rolling(window=lookback_window).mean()
     
@@ -16,30 +36,140 @@ def calculate_dynamic_network_momentum(assets_returns, lookback_window):
     # Áp dụng Lọc (Ví dụ: Minimum Spanning Tree - để có Network G)
     G = build_filtered_network(correlation_matrix)
     
-    # B3: Tính Momentum Spillover
-    spillover_momentum = {}
-    
-    # Map tên assets sang index của Graph
-    asset_names = assets_returns.columns.tolist()
-    
-    for asset in asset_names:
-        # Láng giềng của tài sản i trong Network G
-        neighbors = G.get_neighbors(asset) 
-        
-        if neighbors:
-            # Trọng số có thể là inverse distance/correlation strength
-            weights = calculate_weights(asset, neighbors, correlation_matrix) 
-            
-            # Momentum i (tín hiệu chính) + Momentum từ Láng giềng (Spillover)
-            weighted_neighbor_momentum = sum(weights[j] * momentum_df.iloc[-1][j] for j in neighbors)
-            
-            # Tín hiệu cuối cùng: Kết hợp giữa Momentum riêng và Spillover
-            final_signal = 0.5 * momentum_df.iloc[-1][asset] + 0.5 * weighted_neighbor_momentum
-            spillover_momentum[asset] = final_signal
+    return momentum_df, SpilloverOperator(G, correlation_matrix)
+
+
+class SpilloverOperator:
+    """
+    Ma trận kề có trọng số W (thưa, dạng danh sách cạnh) của Network G.
+    W[i, j] = |rho(i, j)| / tổng |rho(i, k)| trên các láng giềng k của i (tổng = 0 -> trọng số 0).
+    Tín hiệu: S = 0.5 * M + 0.5 * (W @ M) với tài sản có láng giềng, S = M với tài sản cô lập.
+    """
+
+    def __init__(self, network, correlation_matrix):
+        assets = correlation_matrix.columns.tolist()
+        index = {a: i for i, a in enumerate(assets)}
+        self.n = len(assets)
+
+        # Cạnh theo đúng thứ tự láng giềng của từng tài sản (giữ nguyên thứ tự cộng của bản vòng lặp)
+        rows, cols = [], []
+        for a in assets:
+            for nb in network.get_neighbors(a):
+                rows.append(index[a])
+                cols.append(index[nb])
+        self.rows = np.asarray(rows, dtype=np.int64)
+        self.cols = np.asarray(cols, dtype=np.int64)
+
+        # Các cạnh đã gom theo hàng -> mỗi hàng là 1 đoạn liên tục, tổng theo hàng bằng reduceat
+        self.nodes, self.starts = np.unique(self.rows, return_index=True)
+        abs_corr = np.abs(correlation_matrix.values[self.rows, self.cols])
+        if len(abs_corr):
+            totals = np.add.reduceat(abs_corr, self.starts)
+            seg_totals = np.repeat(totals, np.diff(np.append(self.starts, len(abs_corr))))
+            # Tổng = 0 nghĩa là mọi |rho| đều 0 -> giữ trọng số 0 (không chia)
+            self.weights = abs_corr / np.where(seg_totals > 0, seg_totals, 1)
         else:
-            spillover_momentum[asset] = momentum_df.iloc[-1][asset]
-            
-    return spillover_momentum
+            self.weights = abs_corr
+
+    def apply(self, momentum):
+        """momentum: vector (N,) hoặc ma trận (T, N). Trả về tín hiệu cùng shape."""
+        momentum = np.asarray(momentum, dtype=np.float64)
+        signal = momentum.copy()
+        if not len(self.rows):
+            return signal
+
+        contrib = momentum[..., self.cols] * self.weights
+        neighbor = np.add.reduceat(contrib, self.starts, axis=-1)
+        signal[..., self.nodes] = 0.5 * momentum[..., self.nodes] + 0.5 * neighbor
+        return signal
+
+
+def rolling_network_momentum(assets_returns, lookback_window, corr_window=60, step=1, keep_networks=False):
+    """
+    NTF theo thời gian: mỗi `step` phiên dựng lại MST từ tương quan của `corr_window` phiên gần nhất
+    rồi tính Momentum Spillover tại phiên đó. Tổng hiệp phương sai được cập nhật tăng dần khi cửa sổ trượt
+    (thêm phiên mới, bớt phiên cũ) thay vì tính lại .corr() trên cả cửa sổ.
+
+    Args:
+        assets_returns (pd.DataFrame): Lợi nhuận (T × N), không có NaN.
+        lookback_window (int): Cửa sổ momentum cá nhân.
+        corr_window (int): Cửa sổ tương quan trượt.
+        step (int): Tần suất dựng lại Network (1 = mỗi phiên).
+        keep_networks (bool): Trả kèm danh sách (ngày, NetworkWrapper).
+
+    Returns:
+        pd.DataFrame tín hiệu (các phiên dựng Network), hoặc (signals, networks) nếu keep_networks.
+    """
+    assets = assets_returns.columns
+    returns = assets_returns.values.astype(np.float64)
+    momentum = assets_returns.rolling(window=lookback_window).mean().values
+
+    rolling_corr = RollingCorrelation(len(assets), corr_window)
+    dates, signals, networks = [], [], []
+
+    for t in range(len(returns)):
+        rolling_corr.push(returns[t])
+        if not rolling_corr.full or (t - corr_window + 1) % step:
+            continue
+
+        correlation_matrix = pd.DataFrame(rolling_corr.corr(), index=assets, columns=assets)
+        G = build_filtered_network(correlation_matrix)
+        signals.append(SpilloverOperator(G, correlation_matrix).apply(momentum[t]))
+        dates.append(assets_returns.index[t])
+        if keep_networks:
+            networks.append((assets_returns.index[t], G))
+
+    signal_df = pd.DataFrame(np.array(signals).reshape(len(signals), len(assets)), index=dates, columns=assets)
+    return (signal_df, networks) if keep_networks else signal_df
+
+
+class RollingCorrelation:
+    """
+    Tương quan trên cửa sổ trượt với tổng S1 = sum(x), S2 = sum(x x^T) cập nhật hạng-1 mỗi phiên: O(N²)
+    thay vì O(window × N²). Định kỳ (mỗi `window` phiên) tính lại tổng từ ring buffer để triệt sai số cộng dồn.
+    """
+
+    def __init__(self, n_assets, window):
+        self.window = window
+        self.buffer = np.zeros((window, n_assets))
+        self.count = 0
+        self.pos = 0
+        self.s1 = np.zeros(n_assets)
+        self.s2 = np.zeros((n_assets, n_assets))
+        self._since_resync = 0
+
+    @property
+    def full(self):
+        return self.count >= self.window
+
+    def push(self, x):
+        if self.full:
+            old = self.buffer[self.pos]
+            self.s1 -= old
+            self.s2 -= np.outer(old, old)
+        else:
+            self.count += 1
+
+        self.buffer[self.pos] = x
+        self.s1 += x
+        self.s2 += np.outer(x, x)
+        self.pos = (self.pos + 1) % self.window
+
+        self._since_resync += 1
+        if self._since_resync >= self.window:
+            window = self.buffer[:self.count]
+            self.s1 = window.sum(axis=0)
+            self.s2 = window.T @ window
+            self._since_resync = 0
+
+    def corr(self):
+        w = self.count
+        cov = (self.s2 - np.outer(self.s1, self.s1) / w) / (w - 1)
+        std = np.sqrt(np.clip(np.diag(cov), 0, None))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            corr = cov / np.outer(std, std)
+        np.fill_diagonal(corr, np.where(std > 0, 1.0, np.nan))
+        return np.clip(corr, -1, 1)
 
 
 def build_filtered_network(correlation_matrix):
@@ -57,25 +187,22 @@ def build_filtered_network(correlation_matrix):
     corr_values = correlation_matrix.values
     dists = np.sqrt(np.clip(2 * (1 - corr_values), 0, None))
     
-    # Thuật toán Prim
-    selected = [False] * n
-    min_edge = [float('inf')] * n
-    parent = [-1] * n
+    # Thuật toán Prim (vector hóa): mỗi bước chọn đỉnh & cập nhật biên bằng phép toán mảng NumPy
+    # -> còn n bước Python thay vì n² phép so sánh từng phần tử
+    selected = np.zeros(n, dtype=bool)
+    min_edge = np.full(n, np.inf)
+    parent = np.full(n, -1, dtype=np.int64)
     
     min_edge[0] = 0
     
     adjacency = {asset: [] for asset in assets}
     
     for _ in range(n):
-        # Tìm đỉnh chưa chọn có min_edge nhỏ nhất
-        u = -1
-        min_val = float('inf')
-        for i in range(n):
-            if not selected[i] and min_edge[i] < min_val:
-                min_val = min_edge[i]
-                u = i
+        # Tìm đỉnh chưa chọn có min_edge nhỏ nhất (argmin lấy chỉ số nhỏ nhất khi hòa, giống vòng lặp cũ)
+        candidates = np.where(selected, np.inf, min_edge)
+        u = int(np.argmin(candidates))
         
-        if u == -1: break
+        if not candidates[u] < np.inf: break
         
         selected[u] = True
         
@@ -86,11 +213,10 @@ def build_filtered_network(correlation_matrix):
             adjacency[u_name].append(p_name)
             adjacency[p_name].append(u_name)
             
-        # Cập nhật neighbors
-        for v in range(n):
-            if not selected[v] and dists[u][v] < min_edge[v]:
-                min_edge[v] = dists[u][v]
-                parent[v] = u
+        # Cập nhật neighbors: các đỉnh chưa chọn có khoảng cách tới u nhỏ hơn biên hiện tại
+        closer = ~selected & (dists[u] < min_edge)
+        min_edge[closer] = dists[u][closer]
+        parent[closer] = u
                 
     return NetworkWrapper(adjacency)
 
@@ -100,24 +226,3 @@ class NetworkWrapper:
         
     def get_neighbors(self, asset):
         return self.adjacency_map.get(asset, [])
-
-def calculate_weights(asset, neighbors, correlation_matrix):
-    """
-    Tính trọng số ảnh hưởng từ các láng giềng dựa trên độ mạnh tương quan (trị tuyệt đối).
-    """
-    weights = {}
-    total_corr = 0
-    
-    for neighbor in neighbors:
-        # Lấy trị tuyệt đối của tương quan làm trọng số
-        corr = abs(correlation_matrix.loc[asset, neighbor])
-        weights[neighbor] = corr
-        total_corr += corr
-        
-    # Chuẩn hóa trọng số sao cho tổng bằng 1 
-    if total_corr > 0:
-        for neighbor in weights:
-            weights[neighbor] /= total_corr
-            
-    return weights
-
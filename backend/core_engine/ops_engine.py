@@ -1,6 +1,14 @@
 
 import numpy as np
 
+try:
+    from numba import njit  # Tùy chọn: có numba thì biên dịch kernel EG, không có thì dùng NumPy
+except ImportError:
+    njit = None
+
+# Ngưỡng chặn lợi nhuận danh mục ~0 (tránh chia 0/bùng nổ r/R_p), giữ nguyên dấu
+MIN_PORTFOLIO_RETURN = 1e-10
+
 def exponential_gradient_update(current_weights, asset_returns_t, learning_rate, group_mapping=None, alpha=0.0):
     """
     Cập nhật tỷ trọng danh mục (weights) theo thuật toán Exponential Gradient.
@@ -27,6 +35,186 @@ def exponential_gradient_update(current_weights, asset_returns_t, learning_rate,
         
     return new_weights
 
+def backtest_exponential_gradient(returns, learning_rates, alphas=(0.0,), group_mapping=None):
+    """
+    Backtest Exponential Gradient cho NHIỀU bộ tham số cùng lúc (batched).
+    Mọi tổ hợp (learning_rate, alpha) được xếp thành tensor tỷ trọng (P, N) và cập nhật chung
+    trong 1 vòng thời gian -> tuning eta/alpha chỉ là 1 lần gọi thay vì hàng trăm lần chạy tuần tự.
+
+    Args:
+        returns (np.array | pd.DataFrame): Lợi nhuận đơn (pct_change) shape (T, N).
+        learning_rates (array-like): Các giá trị eta.
+        alphas (array-like): Các hệ số Group Sparsity (0 = không regularize).
+        group_mapping (dict | GroupStructure): Map index tài sản -> nhóm (như apply_group_sparsity).
+
+    Returns:
+        dict:
+            learning_rate, alpha (P,): tham số của từng tổ hợp (eta chạy ngoài, alpha chạy trong).
+            wealth (P, T): đường tài sản (vốn ban đầu = 1).
+            turnover (P,): turnover 1 chiều trung bình mỗi kỳ = 0.5 * |w_mới - w_trôi theo giá|.
+            final_weights (P, N): tỷ trọng sau kỳ cuối.
+    """
+    returns = np.asarray(returns, dtype=np.float64)
+    T, N = returns.shape
+    etas, alpha_grid = np.meshgrid(np.asarray(learning_rates, dtype=np.float64),
+                                   np.asarray(alphas, dtype=np.float64), indexing="ij")
+    etas, alpha_grid = etas.ravel(), alpha_grid.ravel()
+    P = len(etas)
+
+    regularize = group_mapping is not None and np.any(alpha_grid > 0)
+    if not regularize:
+        # Không regularize -> chạy trọn T bước trong kernel (numba nếu có)
+        final_weights, wealth, turnover = eg_weight_path(returns, etas)
+        return {
+            "learning_rate": etas,
+            "alpha": alpha_grid,
+            "wealth": wealth,
+            "turnover": turnover / max(T, 1),
+            "final_weights": final_weights,
+        }
+    groups = GroupStructure.from_mapping(group_mapping, N)
+
+    weights = np.full((P, N), 1.0 / N)
+    wealth = np.empty((P, T))
+    turnover = np.zeros(P)
+    capital = np.ones(P)
+
+    for t in range(T):
+        r_t = returns[t]
+        # 1. Lợi nhuận danh mục của mọi tổ hợp
+        portfolio_return = weights @ r_t
+        capital *= 1 + portfolio_return
+        wealth[:, t] = capital
+        portfolio_return = _guard_portfolio_return(portfolio_return)
+
+        # Tỷ trọng "trôi" theo giá trước khi tái cân bằng (để tính turnover)
+        drifted = weights * (1 + r_t)
+        drifted /= drifted.sum(axis=1, keepdims=True)
+
+        # 2-4. Cập nhật EG + chuẩn hóa trong log-space (không tràn exp; nhóm bị cắt về 0 -> log = -inf, giữ 0)
+        with np.errstate(divide="ignore"):
+            log_weights = np.log(weights)
+        new_weights = _log_normalize(log_weights + etas[:, None] * r_t / portfolio_return[:, None])
+
+        # 5. Group Sparsity theo alpha của từng tổ hợp
+        new_weights = groups.soft_threshold(new_weights, alpha_grid)
+
+        turnover += 0.5 * np.abs(new_weights - drifted).sum(axis=1)
+        weights = new_weights
+
+    return {
+        "learning_rate": etas,
+        "alpha": alpha_grid,
+        "wealth": wealth,
+        "turnover": turnover / max(T, 1),
+        "final_weights": weights,
+    }
+
+def eg_weight_path(returns, learning_rates, initial_weights=None):
+    """
+    Chạy trọn đệ quy EG T bước trong 1 lần gọi cho P giá trị eta (không regularize).
+    - Có numba: kernel biên dịch (vòng lặp thời gian không còn overhead Python, phù hợp dữ liệu intraday T lớn).
+    - Không có numba: bản NumPy vector hóa theo (eta, tài sản).
+    An toàn số học: cập nhật trong log-space (trừ max trước khi exp) và chặn R_p ~ 0 theo MIN_PORTFOLIO_RETURN.
+
+    Returns:
+        (final_weights (P, N), wealth (P, T), tổng turnover 1 chiều (P,))
+    """
+    returns = np.ascontiguousarray(returns, dtype=np.float64)
+    etas = np.ascontiguousarray(np.atleast_1d(learning_rates), dtype=np.float64)
+    N = returns.shape[1]
+    if initial_weights is None:
+        initial_weights = np.full(N, 1.0 / N)
+    w0 = np.ascontiguousarray(initial_weights, dtype=np.float64)
+    return _eg_kernel(returns, etas, w0)
+
+def _guard_portfolio_return(portfolio_return):
+    return np.where(np.abs(portfolio_return) < MIN_PORTFOLIO_RETURN,
+                    np.copysign(MIN_PORTFOLIO_RETURN, portfolio_return), portfolio_return)
+
+def _log_normalize(log_weights):
+    # softmax theo hàng: exp(log_w - max) / sum -> tổng = 1, không tràn số
+    shifted = log_weights - log_weights.max(axis=1, keepdims=True)
+    weights = np.exp(shifted)
+    return weights / weights.sum(axis=1, keepdims=True)
+
+def _log_softmax(log_weights):
+    # Chuẩn hóa ngay trong log-space: log_w - logsumexp(log_w)
+    top = log_weights.max(axis=1, keepdims=True)
+    return log_weights - (top + np.log(np.exp(log_weights - top).sum(axis=1, keepdims=True)))
+
+def _eg_path_numpy(returns, etas, w0):
+    T, N = returns.shape
+    # Trạng thái là log tỷ trọng -> tỷ trọng rất nhỏ không bị underflow về 0 rồi log(0)
+    with np.errstate(divide="ignore"):
+        log_weights = np.tile(np.log(w0), (len(etas), 1))
+    weights = np.exp(log_weights)
+    wealth = np.empty((len(etas), T))
+    turnover = np.zeros(len(etas))
+    capital = np.ones(len(etas))
+
+    for t in range(T):
+        r_t = returns[t]
+        portfolio_return = weights @ r_t
+        capital *= 1 + portfolio_return
+        wealth[:, t] = capital
+        portfolio_return = _guard_portfolio_return(portfolio_return)
+
+        drifted = weights * (1 + r_t)
+        drifted /= drifted.sum(axis=1, keepdims=True)
+        log_weights = _log_softmax(log_weights + etas[:, None] * r_t / portfolio_return[:, None])
+        weights = np.exp(log_weights)
+        turnover += 0.5 * np.abs(weights - drifted).sum(axis=1)
+    return weights, wealth, turnover
+
+def _eg_path_loops(returns, etas, w0):
+    # Cùng công thức với _eg_path_numpy, viết bằng vòng lặp thuần để numba biên dịch
+    T, N = returns.shape
+    P = etas.shape[0]
+    final_weights = np.empty((P, N))
+    wealth = np.empty((P, T))
+    turnover = np.zeros(P)
+    log_w = np.empty(N)
+    drifted = np.empty(N)
+
+    for p in range(P):
+        w = w0.copy()
+        for i in range(N):
+            log_w[i] = np.log(w0[i])
+        capital = 1.0
+        for t in range(T):
+            portfolio_return = 0.0
+            for i in range(N):
+                portfolio_return += w[i] * returns[t, i]
+            capital *= 1.0 + portfolio_return
+            wealth[p, t] = capital
+            if abs(portfolio_return) < MIN_PORTFOLIO_RETURN:
+                portfolio_return = MIN_PORTFOLIO_RETURN if portfolio_return >= 0 else -MIN_PORTFOLIO_RETURN
+
+            drift_sum = 0.0
+            max_log = -np.inf
+            for i in range(N):
+                drifted[i] = w[i] * (1.0 + returns[t, i])
+                drift_sum += drifted[i]
+                log_w[i] += etas[p] * returns[t, i] / portfolio_return
+                if log_w[i] > max_log:
+                    max_log = log_w[i]
+
+            total = 0.0
+            for i in range(N):
+                total += np.exp(log_w[i] - max_log)
+            log_total = max_log + np.log(total)
+            step_turnover = 0.0
+            for i in range(N):
+                log_w[i] -= log_total
+                w[i] = np.exp(log_w[i])
+                step_turnover += abs(w[i] - drifted[i] / drift_sum)
+            turnover[p] += 0.5 * step_turnover
+        final_weights[p] = w
+    return final_weights, wealth, turnover
+
+_eg_kernel = njit(cache=True)(_eg_path_loops) if njit is not None else _eg_path_numpy
+
 def apply_group_sparsity(weights, group_mapping, alpha):
     """
     Áp dụng Regularization thưa theo nhóm (Group Sparsity).
@@ -34,50 +222,77 @@ def apply_group_sparsity(weights, group_mapping, alpha):
     
     Args:
         weights (np.array): Mảng tỷ trọng tài sản hiện tại.
-        group_mapping (dict): Map index của tài sản tới index của nhóm/ngành. 
+        group_mapping (dict | GroupStructure): Map index của tài sản tới index của nhóm/ngành. 
                               VD: {0: 'Tech', 1: 'Tech', 2: 'Finance', ...}
                               Hoặc index nhóm: {0: 0, 1: 0, 2: 1, ...}
+                              Nên truyền GroupStructure dựng sẵn khi gọi mỗi phiên (tránh dựng lại chỉ mục nhóm).
         alpha (float): Hệ số Regularization (ngưỡng cắt).
     
     Returns:
         np.array: Tỷ trọng mới đã qua regularize và chuẩn hóa lại.
     """
-    # Xác định các nhóm duy nhất
-    groups = np.unique(list(group_mapping.values()))
-    
-    # Tạo copy để không ảnh hưởng mảng gốc lúc tính toán
-    regularized_weights = weights.copy()
-    
-    # Duyệt qua từng nhóm
-    for g in groups:
-        # Lấy indices của các tài sản thuộc nhóm g
-        asset_indices = [i for i, group_id in group_mapping.items() if group_id == g]
-        
-        if not asset_indices:
-            continue
-            
-        # Lấy vector trọng số của nhóm r_g
-        w_g = weights[asset_indices]
-        
-        # Tính L2 Norm của nhóm ||w_g||_2
-        norm_g = np.linalg.norm(w_g)
-        
-        # Áp dụng Soft Thresholding lên Norm
-        # factor = max(0, 1 - alpha / norm_g)
-        if norm_g == 0:
-            factor = 0
-        else:
-            factor = max(0, 1 - alpha / norm_g)
-            
-        # Cập nhật trọng số tài sản trong nhóm
-        regularized_weights[asset_indices] = w_g * factor
-        
-    # Chuẩn hóa lại để tổng bằng 1 (Chiếu lên Simplex)
-    if np.sum(regularized_weights) > 0:
-        regularized_weights /= np.sum(regularized_weights)
-    else:
-        # Trường hợp hiếm: tất cả bị cắt về 0 -> chia đều (fallback)
-        n = len(weights)
-        regularized_weights = np.ones(n) / n
-        
-    return regularized_weights
+    return GroupStructure.from_mapping(group_mapping, len(weights)).soft_threshold(weights, alpha)
+
+
+class GroupStructure:
+    """
+    Cấu trúc nhóm dựng 1 LẦN từ map ngành, tái sử dụng mỗi phiên tái cân bằng.
+    Tài sản được hoán vị để mỗi nhóm là 1 đoạn liên tục -> L2 norm từng nhóm = 1 phép np.add.reduceat,
+    thay vì np.unique + quét toàn bộ map cho từng nhóm (O(nhóm × tài sản) mỗi lần gọi).
+    Tài sản không thuộc nhóm nào giữ nguyên tỷ trọng (trước bước chuẩn hóa), như bản gốc.
+    """
+
+    def __init__(self, asset_groups, n_assets):
+        """asset_groups: mảng nhãn nhóm theo index tài sản (None = không thuộc nhóm nào)."""
+        self.n_assets = n_assets
+        member_idx = [i for i, g in enumerate(asset_groups) if g is not None]
+        labels = [asset_groups[i] for i in member_idx]
+        self.groups, codes = np.unique(labels, return_inverse=True) if labels else (np.array([]), np.array([], dtype=np.int64))
+
+        # Hoán vị ổn định theo mã nhóm -> các đoạn liên tục [starts[g], starts[g] + counts[g])
+        perm = np.argsort(codes, kind="stable")
+        self.order = np.asarray(member_idx, dtype=np.int64)[perm]
+        self.counts = np.bincount(codes, minlength=len(self.groups))
+        self.starts = np.concatenate([[0], np.cumsum(self.counts)[:-1]]).astype(np.int64)
+
+    @classmethod
+    def from_mapping(cls, group_mapping, n_assets):
+        if isinstance(group_mapping, cls):
+            return group_mapping  # Đã dựng sẵn -> dùng lại
+        asset_groups = [None] * n_assets
+        for i, group_id in group_mapping.items():
+            asset_groups[i] = group_id
+        return cls(asset_groups, n_assets)
+
+    @classmethod
+    def from_sectors(cls, tickers, sector_map=None):
+        """Dựng từ danh sách mã + map ngành (mặc định đọc các file RRG_*.txt)."""
+        from core_engine.sectors import assign_groups, load_sector_map
+        if sector_map is None:
+            sector_map = load_sector_map()
+        return cls.from_mapping(assign_groups(tickers, sector_map), len(tickers))
+
+    def group_norms(self, weights):
+        """L2 norm của từng nhóm: (G,) hoặc (P, G) với weights (P, N)."""
+        if not len(self.order):
+            return np.zeros(weights.shape[:-1] + (0,))
+        return np.sqrt(np.add.reduceat(weights[..., self.order] ** 2, self.starts, axis=-1))
+
+    def soft_threshold(self, weights, alpha):
+        """
+        Soft-threshold trên L2 norm nhóm rồi chiếu lại lên Simplex.
+        weights (N,) với alpha vô hướng, hoặc (P, N) với alpha (P,) (alpha <= 0 -> giữ nguyên hàng đó).
+        """
+        weights = np.asarray(weights, dtype=np.float64)
+        regularized_weights = weights.copy()
+        if len(self.order):
+            alpha = np.asarray(alpha, dtype=np.float64)
+            norms = self.group_norms(weights)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                factor = np.where(norms > 0, np.maximum(0, 1 - alpha[..., None] / norms), 0.0)
+            factor[alpha <= 0] = 1.0
+            regularized_weights[..., self.order] = weights[..., self.order] * np.repeat(factor, self.counts, axis=-1)
+
+        # Chuẩn hóa lại để tổng bằng 1; hàng bị cắt hết về 0 -> chia đều (fallback)
+        totals = regularized_weights.sum(axis=-1, keepdims=True)
+        return np.where(totals > 0, regularized_weights / np.where(totals > 0, totals, 1), 1.0 / self.n_assets)
@@ -0,0 +1,210 @@
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytz
+
+try:
+    import fcntl  # POSIX: file lock chọn 1 worker chạy lịch
+except ImportError:
+    fcntl = None  # Windows: chạy 1 process -> worker này luôn là leader
+
+from core_engine.oracle_sources import BENCHMARK_TICKER
+
+# Làm mới Oracle phía Server theo lịch (thay cho chạy tay colab_oracle_pusher.txt lúc 8h sáng).
+VN_TZ = pytz.timezone("Asia/Ho_Chi_Minh")
+RECENT_SESSIONS = 40     # Số phiên gần nhất cho RRG Trail / ngắn hạn (như Colab)
+MOM_HISTORY_LENGTH = 252
+
+# --- TRÍCH XUẤT (giống run_oracle_extraction của Colab, vector hóa) ---
+def _clean_map(series):
+    return {t: (None if pd.isna(v) else float(v)) for t, v in series.items()}
+
+def extract_oracle(prices, benchmark=BENCHMARK_TICKER):
+    """
+    prices: DataFrame giá đóng cửa (ngày × mã). Trả về (prices đã làm sạch, oracle_base).
+    Khác Colab: không dropna() cả bảng (1 mã mới niêm yết sẽ cắt lịch sử của mọi mã) -
+    chỉ bỏ phiên thiếu benchmark, mã lịch sử ngắn giữ NaN phía trên như PriceStore.
+    oracle_base: ma200_map, price_t20_map, mom_history_array, breadth_t1, recent_dates, as_of.
+    """
+    data = prices.sort_index().dropna(axis=1, how="all").ffill()
+    basket = [c for c in data.columns if c != benchmark]
+    if not basket:
+        raise ValueError("Dữ liệu nguồn không có mã cổ phiếu nào.")
+    if benchmark not in data.columns:
+        print("⚠️ Thiếu VNINDEX, dùng trung bình rổ làm chỉ số giả lập...")
+        data[benchmark] = data[basket].mean(axis=1)
+    data = data[data[benchmark].notna()]
+    if len(data) < 2:
+        raise ValueError("Dữ liệu nguồn chưa đủ 2 phiên.")
+
+    # A. MA200 - xu hướng dài hạn
+    ma200 = data.rolling(window=200).mean().iloc[-1]
+    # B. Giá 20 phiên trước - momentum
+    price_t20 = data.iloc[-20] if len(data) > 20 else data.iloc[0]
+    # C. Lịch sử momentum của rổ (xếp hạng percentile)
+    basket_ret = data[basket].pct_change().mean(axis=1)
+    mom_history = (basket_ret.rolling(window=20).mean() * 20).dropna().tail(MOM_HISTORY_LENGTH)
+    # D. Độ rộng T-1: tỷ lệ mã có RS (so với benchmark) trung bình 10 phiên > 100
+    rs_ma = (100 * data[basket].div(data[benchmark], axis=0)).rolling(10).mean().iloc[-1]
+    breadth_t1 = float(np.count_nonzero(rs_ma.to_numpy() > 100) / len(basket))
+    # E. Nhãn ngày của các phiên gần nhất (giá nằm sẵn trong kho)
+    recent_dates = [d.strftime("%Y-%m-%d") if hasattr(d, "strftime") else str(d) for d in data.index[-RECENT_SESSIONS:]]
+
+    base = {
+        "ma200_map": _clean_map(ma200),
+        "price_t20_map": _clean_map(price_t20),
+        "mom_history_array": mom_history.tolist(),
+        "breadth_t1": breadth_t1,
+        "recent_dates": recent_dates,
+        "as_of": recent_dates[-1],
+    }
+    return data, base
+
+# --- LỊCH CHẠY ---
+class DailySchedule:
+    """
+    Lịch kiểu cron rút gọn: các giờ cố định trong ngày, chỉ vào các thứ cho phép (giờ Việt Nam).
+    VD: DailySchedule.parse("08:00,15:15", "0-4") = 8h00 và 15h15 từ thứ 2 tới thứ 6.
+    """
+
+    def __init__(self, times, weekdays=range(5), tz=VN_TZ):
+        self.times = sorted(times)           # [(giờ, phút)]
+        self.weekdays = set(weekdays)        # 0 = thứ 2 ... 6 = chủ nhật
+        self.tz = tz
+
+    @classmethod
+    def parse(cls, times_spec, days_spec="0-4"):
+        times = [tuple(int(x) for x in t.strip().split(":")) for t in times_spec.split(",") if t.strip()]
+        weekdays = set()
+        for part in days_spec.split(","):
+            lo, _, hi = part.strip().partition("-")
+            weekdays.update(range(int(lo), int(hi or lo) + 1))
+        return cls(times, weekdays)
+
+    def _slots(self, moment, days):
+        local = moment.astimezone(self.tz)
+        for offset in days:
+            day = (local + timedelta(days=offset)).date()
+            if day.weekday() in self.weekdays:
+                for hour, minute in self.times:
+                    yield self.tz.localize(datetime(day.year, day.month, day.day, hour, minute))
+
+    def next_after(self, moment):
+        return min((s for s in self._slots(moment, range(0, 8)) if s > moment), default=None)
+
+    def previous_before(self, moment):
+        return max((s for s in self._slots(moment, range(-7, 1)) if s <= moment), default=None)
+
+# --- SCHEDULER ---
+class OracleScheduler:
+    """
+    Thread nền làm mới Oracle: tới lịch (hoặc dữ liệu đang cũ hơn mốc lịch gần nhất) ->
+    source.load() -> extract_oracle() -> on_refresh(prices, oracle_base).
+    - Tải + tính toán chạy trong thread riêng, không chặn event loop.
+    - Nhiều worker: chỉ worker giữ file lock chạy; worker khác thử lại định kỳ (worker giữ lock chết -> thay thế).
+    - Lỗi (mất mạng, nguồn rỗng...) -> thử lại sau retry_seconds, không đợi tới mốc lịch sau.
+    """
+
+    def __init__(self, source, schedule, lock_path=None, retry_seconds=300, clock=time.time):
+        self.source = source
+        self.schedule = schedule
+        self.retry_seconds = retry_seconds
+        self._clock = clock
+        self._lock_path = lock_path or os.path.join(tempfile.gettempdir(), "quant_oracle_scheduler.lock")
+        self._lock_file = None
+        self._stop = threading.Event()
+        self._thread = None
+        self._retry_at = None
+        self.runs = 0
+        self.last_run = None
+        self.last_success = None
+        self.last_error = None
+
+    def start(self, on_refresh, freshness):
+        """
+        on_refresh(prices, oracle_base): nạp dữ liệu mới (gọi từ thread scheduler).
+        freshness(): epoch giây của lần dữ liệu được làm mới gần nhất (0 = chưa có dữ liệu).
+        """
+        self._on_refresh = on_refresh
+        self._freshness = freshness
+        self._thread = threading.Thread(target=self._loop, name="oracle-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+    def _acquire_leadership(self):
+        if self._lock_file is None:
+            f = open(self._lock_path, "a")
+            try:
+                if fcntl is not None: fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                f.close()
+                return False
+            self._lock_file = f  # Giữ fd mở = giữ lock tới khi process thoát
+        return True
+
+    def run_once(self):
+        """Chạy 1 lượt làm mới ngay (dùng cho cả vòng lặp lịch lẫn gọi tay). Trả về True nếu thành công."""
+        self.runs += 1
+        self.last_run = self._clock()
+        try:
+            prices, base = extract_oracle(self.source.load())
+            self._on_refresh(prices, base)
+        except Exception as e:
+            self.last_error = f"{type(e).__name__}: {e}"
+            self._retry_at = self._clock() + self.retry_seconds
+            print(f"Oracle refresh fail ({self.source.name}): {self.last_error}")
+            return False
+        self.last_success = self._clock()
+        self.last_error = None
+        self._retry_at = None
+        print(f"Oracle refreshed from {self.source.name}: {prices.shape[1]} mã x {prices.shape[0]} phiên ({base['as_of']})")
+        return True
+
+    def _seconds_until_due(self):
+        now = self._clock()
+        moment = datetime.fromtimestamp(now, VN_TZ)
+        if self._retry_at is not None:
+            return max(0.0, self._retry_at - now)
+        previous = self.schedule.previous_before(moment)
+        fresh_at = max(self._freshness() or 0, self.last_success or 0)
+        if previous is not None and fresh_at < previous.timestamp():
+            return 0.0  # Dữ liệu cũ hơn mốc lịch gần nhất (VD: vừa khởi động, Server đang "waiting")
+        upcoming = self.schedule.next_after(moment)
+        return 3600.0 if upcoming is None else upcoming.timestamp() - now
+
+    def _loop(self):
+        while not self._stop.is_set():
+            if not self._acquire_leadership():
+                self._stop.wait(30)
+                continue
+            wait = self._seconds_until_due()
+            if wait <= 0:
+                self.run_once()
+                continue
+            # Ngủ tối đa 1 giờ rồi tính lại (đồng hồ hệ thống có thể bị chỉnh)
+            self._stop.wait(min(wait, 3600.0))
+
+    def status(self):
+        upcoming = self.schedule.next_after(datetime.fromtimestamp(self._clock(), VN_TZ))
+        return {
+            "source": self.source.name,
+            "leader": self._lock_file is not None,
+            "runs": self.runs,
+            "last_run": self.last_run,
+            "last_success": self.last_success,
+            "last_error": self.last_error,
+            "retry_at": self._retry_at,
+            "next_run": None if upcoming is None else upcoming.isoformat(),
+        }
@@ -0,0 +1,48 @@
+import os
+
+import pandas as pd
+
+from core_engine.sectors import load_sector_map
+
+# Nguồn dữ liệu cho bộ làm mới Oracle theo lịch. Mỗi nguồn có:
+#   name: tên hiển thị trong trạng thái scheduler
+#   load(): DataFrame giá đóng cửa (ngày × mã, cũ -> mới), cột là mã dạng "HPG.VN" / "^VNINDEX"
+BENCHMARK_TICKER = "^VNINDEX"
+
+def default_universe(sector_map=None):
+    """Mọi mã trong các file RRG_*.txt (thứ tự theo file, không trùng) + chỉ số VNINDEX."""
+    if sector_map is None:
+        sector_map = load_sector_map()
+    tickers = dict.fromkeys(f"{t}.VN" for members in sector_map.values() for t in members)
+    return list(tickers) + [BENCHMARK_TICKER]
+
+
+class ProviderSource:
+    """Tải cả rổ qua 1 provider (Yahoo / vnstock / hedged / fake) rồi ghép giá đóng cửa theo ngày."""
+
+    def __init__(self, provider, tickers=None, period="1y"):
+        self.provider = provider
+        self.tickers = list(tickers or default_universe())
+        self.period = period
+        self.name = f"{provider.name}:{len(self.tickers)} mã/{period}"
+
+    def load(self):
+        frames = self.provider.fetch_many(self.tickers, self.period)
+        if not frames:
+            raise RuntimeError(f"{self.provider.name} không trả về dữ liệu.")
+        close = pd.DataFrame({t: frames[t]["close"] for t in self.tickers if t in frames})
+        return close.sort_index()
+
+
+class FileSource:
+    """
+    Đọc giá từ file CSV cục bộ (cột đầu là ngày, mỗi cột sau là 1 mã) - dùng cho test/offline.
+    Đọc lại mỗi lần chạy -> ghi đè file là lần làm mới sau thấy dữ liệu mới.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.name = f"file:{os.path.basename(path)}"
+
+    def load(self):
+        return pd.read_csv(self.path, index_col=0, parse_dates=True)
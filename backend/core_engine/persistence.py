@@ -0,0 +1,139 @@
+import asyncio
+import atexit
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from core_engine.price_store import PriceStore
+
+META_FILE = "oracle_meta.json"
+
+def save_snapshot(directory, store, meta):
+    """
+    Ghi ma trận giá ra file .npy (memory-map được) + meta JSON (tickers, lengths, cache dẫn xuất).
+    Ghi file ma trận mới theo phiên bản rồi mới thay meta bằng os.replace -> không bao giờ đọc phải file dở dang.
+    """
+    _write_snapshot(directory, store.matrix, None, store.tickers, store.lengths, meta)
+
+def _write_snapshot(directory, matrix, last_row, tickers, lengths, meta):
+    # last_row: bản copy phiên cuối (append-oracle có thể ghi đè tại chỗ hàng cuối trong lúc thread đang ghi)
+    os.makedirs(directory, exist_ok=True)
+    matrix_file = f"prices_{time.time_ns()}.npy"
+
+    out = np.lib.format.open_memmap(os.path.join(directory, matrix_file), mode="w+",
+                                    dtype=np.float64, shape=matrix.shape)
+    if last_row is None:
+        out[:] = matrix
+    elif len(matrix):
+        out[:-1] = matrix[:-1]
+        out[-1] = last_row
+    out.flush()
+    del out
+
+    record = dict(meta)
+    record.update({
+        "matrix_file": matrix_file,
+        "shape": list(matrix.shape),
+        "tickers": tickers,
+        "lengths": lengths.tolist(),
+    })
+    tmp_path = os.path.join(directory, META_FILE + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(record, f, ensure_ascii=False)
+    os.replace(tmp_path, os.path.join(directory, META_FILE))
+
+    # Dọn các ma trận cũ (process khác đang map vẫn đọc được tới khi đóng)
+    for name in os.listdir(directory):
+        if name.startswith("prices_") and name.endswith(".npy") and name != matrix_file:
+            try: os.remove(os.path.join(directory, name))
+            except OSError: pass
+
+def load_snapshot(directory):
+    """
+    Map lại snapshot gần nhất (mmap_mode='r'): không đọc cả ma trận vào RAM, trang nào dùng mới nạp.
+    Trả về (PriceStore, meta) hoặc None nếu chưa có snapshot hợp lệ.
+    """
+    meta_path = os.path.join(directory, META_FILE)
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path, encoding="utf-8") as f:
+        meta = json.load(f)
+
+    matrix = np.load(os.path.join(directory, meta["matrix_file"]), mmap_mode="r")
+    if list(matrix.shape) != meta["shape"] or matrix.shape[1] != len(meta["tickers"]):
+        return None
+    return PriceStore(matrix, meta["tickers"], meta["lengths"]), meta
+
+
+class SnapshotWriter:
+    """
+    Ghi snapshot trong 1 thread riêng, không chặn event loop; các lần ghi dồn dập được gộp lại.
+    - submit(store, meta, delay): chụp trạng thái ngay (view ma trận + copy hàng cuối/lengths, O(N)), hẹn ghi sau
+      delay giây. Lần submit mới trong lúc chờ chỉ thay bản sẽ ghi -> 1 lần ghi cho cả loạt append trong phiên.
+    - Các hàng trước phiên cuối không bao giờ bị sửa tại chỗ (append ghi vào phần đệm phía sau / buffer mới)
+      nên thread đọc view ma trận an toàn trong khi event loop tiếp tục nhận phiên mới.
+    - flush(): ghi ngay bản đang chờ ngay trong thread gọi (lúc tắt server / thoát process) - không mất phiên đã nhận.
+    Mỗi bản chụp có số thứ tự: bản cũ hơn bản đã ghi thì bỏ qua -> flush và thread nền không ghi đè lùi nhau.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="persist")
+        self._lock = threading.Lock()
+        self._pending = None
+        self._timer = None
+        self._timer_loop = None
+        self._seq = 0
+        self._written = 0
+        self.writes = 0
+        self.last_error = None
+        atexit.register(self.flush)
+
+    def submit(self, store, meta, delay=0.0):
+        matrix = store.matrix
+        self._seq += 1
+        self._pending = (self._seq, (matrix, matrix[-1].copy() if len(matrix) else None,
+                                     list(store.tickers), store.lengths.copy(), dict(meta)))
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.flush()  # Ngoài event loop (script / khởi động) -> ghi luôn
+            return
+        if self._timer is not None and self._timer_loop is loop:
+            if delay > 0: return  # Đã hẹn ghi -> bản mới sẽ được ghi trong lượt đó
+            self._timer.cancel()
+        self._timer, self._timer_loop = loop.call_later(delay, self._dispatch), loop
+
+    def _dispatch(self):
+        self._timer = None
+        snapshot, self._pending = self._pending, None
+        if snapshot is not None:
+            self._executor.submit(self._write, snapshot)
+
+    def _write(self, snapshot):
+        seq, args = snapshot
+        with self._lock:
+            if seq <= self._written: return
+            try:
+                _write_snapshot(self.directory, *args)
+                self._written = seq
+                self.writes += 1
+                self.last_error = None
+            except Exception as e:
+                self.last_error = f"{type(e).__name__}: {e}"
+                print(f"Persist fail: {self.last_error}")
+
+    def flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        snapshot, self._pending = self._pending, None
+        if snapshot is not None:
+            self._write(snapshot)
+
+    def status(self):
+        return {"pending": self._pending is not None, "writes": self.writes, "error": self.last_error}
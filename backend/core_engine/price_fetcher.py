@@ -0,0 +1,125 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import yfinance as yf
+
+from core_engine.ttl_cache import TTLLRUCache
+
+def download_close(ticker, period, interval="1d"):
+    """Tải giá đóng cửa (đã điều chỉnh) của 1 mã từ Yahoo. Chạy trong thread, KHÔNG gọi từ event loop."""
+    # Ticker.history dùng object riêng -> an toàn khi nhiều thread tải song song (yf.download dùng state chung)
+    df = yf.Ticker(ticker).history(period=period, interval=interval, auto_adjust=True)
+    if df is None or df.empty or "Close" not in df:
+        return np.empty(0)
+    return df["Close"].dropna().to_numpy(dtype=np.float64)
+
+# yf.download giữ kết quả trong state cấp module -> chỉ cho 1 lượt tải nhóm chạy tại 1 thời điểm
+_YF_DOWNLOAD_LOCK = threading.Lock()
+
+def download_close_frame(tickers, period, interval="1d"):
+    """Giá đóng cửa nhiều mã trong 1 lượt yf.download([...]): DataFrame (ngày × mã), None nếu không có dữ liệu."""
+    with _YF_DOWNLOAD_LOCK:
+        df = yf.download(list(tickers), period=period, interval=interval, progress=False, auto_adjust=True)
+    if df is None or df.empty or "Close" not in df:
+        return None
+    close = df["Close"]
+    if not hasattr(close, "columns"):
+        close = close.to_frame(name=tickers[0])
+    return close
+
+def download_close_many(tickers, period, interval="1d"):
+    """Tải giá đóng cửa của nhiều mã trong 1 lượt yf.download([...]). Trả về {ticker: np.array}."""
+    close = download_close_frame(tickers, period, interval)
+    if close is None:
+        return {}
+    return {t: close[t].dropna().to_numpy(dtype=np.float64) for t in close.columns if t in tickers}
+
+
+class PriceFetcher:
+    """
+    Dịch vụ tải giá on-demand cho các mã ngoài payload Oracle.
+    - Tải trong thread pool có giới hạn -> không chặn event loop.
+    - Single-flight: nhiều request cùng (ticker, period, interval) chỉ sinh 1 lượt tải.
+    - Kết quả giữ trong cache TTL + LRU có ngân sách byte -> request sau là RAM hit, không phình RAM.
+    """
+
+    def __init__(self, download_fn=download_close, download_many_fn=download_close_many,
+                 max_workers=4, cache_max_bytes=32 * 1024 * 1024, cache_ttl=300):
+        self._download = download_fn
+        self._download_many = download_many_fn
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="price-fetch")
+        self._inflight = {}
+        self.cache = TTLLRUCache(cache_max_bytes, cache_ttl)
+
+    async def fetch(self, ticker, period, interval="1d"):
+        key = (ticker, period, interval)
+        prices = self.cache.get(key)
+        if prices is not None:
+            return prices
+
+        task = self._inflight.get(key)
+        if task is None:
+            print(f"Fetching live for {ticker}...")
+            task = asyncio.ensure_future(self._run(key))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # shield: 1 client ngắt kết nối không được hủy lượt tải mà các client khác đang chờ
+        return await asyncio.shield(task)
+
+    async def _run(self, key):
+        ticker, period, interval = key
+        loop = asyncio.get_running_loop()
+        prices = await loop.run_in_executor(self._executor, self._download, ticker, period, interval)
+        if len(prices):
+            self.cache.put(key, prices)
+        return prices
+
+    async def fetch_many(self, tickers, period, interval="1d"):
+        """
+        Lấy giá cho danh sách mã: hit trả từ cache, mã đang tải thì chờ chung,
+        các mã còn thiếu gom vào ĐÚNG 1 lượt tải nhóm. Mã lỗi/không có dữ liệu -> mảng rỗng.
+        """
+        results, waiting, missing = {}, {}, []
+        for t in dict.fromkeys(tickers):
+            key = (t, period, interval)
+            prices = self.cache.get(key)
+            if prices is not None:
+                results[t] = prices
+            elif key in self._inflight:
+                waiting[t] = self._inflight[key]
+            else:
+                missing.append(t)
+
+        if missing:
+            print(f"Fetching live batch {len(missing)} tickers...")
+            group = asyncio.ensure_future(self._run_group(missing, period, interval))
+            for t in missing:
+                # Đăng ký từng mã vào single-flight để request lẻ cùng lúc cũng chờ lượt tải nhóm này
+                key = (t, period, interval)
+                task = asyncio.ensure_future(self._pick(group, t))
+                self._inflight[key] = task
+                task.add_done_callback(lambda _, key=key: self._inflight.pop(key, None))
+                waiting[t] = task
+
+        for t, task in waiting.items():
+            try:
+                results[t] = await asyncio.shield(task)
+            except Exception as e:
+                print(f"Live fetch fail {t}: {e}")
+                results[t] = np.empty(0)
+        return results
+
+    async def _run_group(self, tickers, period, interval):
+        loop = asyncio.get_running_loop()
+        prices_map = await loop.run_in_executor(self._executor, self._download_many, tickers, period, interval)
+        for t, prices in prices_map.items():
+            if len(prices):
+                self.cache.put((t, period, interval), prices)
+        return prices_map
+
+    @staticmethod
+    async def _pick(group, ticker):
+        prices_map = await asyncio.shield(group)
+        return prices_map.get(ticker, np.empty(0))
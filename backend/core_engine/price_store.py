@@ -0,0 +1,142 @@
+import numpy as np
+
+# Key phụ trong payload JSON của colab_oracle_pusher.txt - không phải mã, không bao giờ thành cột giá
+COLAB_META_KEYS = frozenset({"ma200_map", "price_t20_map", "mom_history_array", "breadth_t1", "recent_prices_json", "session"})
+
+class PriceStore:
+    """
+    Kho giá dạng cột (Columnar) thay cho dict-of-lists.
+    - Một ma trận float64 duy nhất (ngày × mã), căn lề PHẢI: hàng cuối luôn là phiên mới nhất của mọi mã.
+    - Mã có lịch sử ngắn hơn được đệm NaN ở phía trên.
+    - ticker -> cột qua dict index, mọi accessor trả về view (O(1), không copy).
+    """
+
+    def __init__(self, matrix=None, tickers=None, lengths=None):
+        tickers = list(tickers or [])
+        if matrix is None:
+            matrix = np.empty((0, len(tickers)), dtype=np.float64)
+        self.matrix = matrix
+        self.tickers = tickers
+        self.index = {t: j for j, t in enumerate(tickers)}
+
+        if lengths is None and matrix.shape[0] == 0:
+            lengths = np.zeros(len(tickers), dtype=np.int64)
+        elif lengths is None:
+            # Số phiên hợp lệ của mỗi cột = tính từ giá trị khác NaN đầu tiên tới hàng cuối
+            valid = ~np.isnan(matrix)
+            first = np.where(valid.any(axis=0), valid.argmax(axis=0), matrix.shape[0])
+            lengths = matrix.shape[0] - first
+        self.lengths = np.asarray(lengths, dtype=np.int64)
+        # Bộ đệm có dung lượng dự trữ để append phiên mới không phải copy cả ma trận
+        self._buffer = matrix
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Dựng kho từ payload {ticker: [giá cũ -> giá mới]} hoặc {ticker: {ngày: giá}} (DataFrame.to_json của Colab).
+        Bỏ qua key phụ của payload Colab (COLAB_META_KEYS) và giá trị không phải chuỗi giá.
+        Giá null ở đầu chuỗi (mã niêm yết sau) bị cắt -> cột căn lề phải như các đường nạp khác.
+        """
+        columns = {}
+        for t, v in data.items():
+            if t in COLAB_META_KEYS: continue
+            if isinstance(v, dict): v = [v[d] for d in sorted(v)]  # Ngày ISO -> sắp theo chuỗi là theo thời gian
+            elif not isinstance(v, (list, tuple, np.ndarray)): continue
+            values = np.asarray(v, dtype=np.float64)
+            valid = np.flatnonzero(~np.isnan(values))
+            columns[t] = values[valid[0]:] if len(valid) else values[:0]
+        tickers = list(columns.keys())
+        n_rows = max((len(v) for v in columns.values()), default=0)
+
+        matrix = np.full((n_rows, len(tickers)), np.nan, dtype=np.float64)
+        lengths = np.zeros(len(tickers), dtype=np.int64)
+        for j, t in enumerate(tickers):
+            values = columns[t]
+            if len(values):
+                matrix[n_rows - len(values):, j] = values
+            lengths[j] = len(values)
+        return cls(matrix, tickers, lengths)
+
+    # --- CẬP NHẬT ---
+    def append(self, rows):
+        """
+        Nối thêm k phiên mới (k, N) vào cuối ma trận, cột theo thứ tự self.tickers.
+        Ô NaN được forward-fill từ phiên trước (giống ffill() của Colab pusher).
+        Chi phí khấu hao O(N) mỗi phiên nhờ bộ đệm tăng dần, không copy lại lịch sử.
+        """
+        rows = np.array(rows, dtype=np.float64, ndmin=2)
+        n, k = self.n_rows, len(rows)
+
+        prev = self.matrix[-1] if n else np.full(len(self.tickers), np.nan)
+        for r in range(k):
+            rows[r] = np.where(np.isnan(rows[r]), prev, rows[r])
+            prev = rows[r]
+
+        buf = self._buffer
+        if n + k > buf.shape[0] or not buf.flags.writeable:
+            buf = np.empty((n + k + max(n // 4, 64), len(self.tickers)), dtype=np.float64)
+            buf[:n] = self.matrix
+            self._buffer = buf
+        buf[n:n + k] = rows
+
+        # Cột đang rỗng: độ dài tính từ giá trị hợp lệ đầu tiên trong các phiên mới
+        valid = ~np.isnan(rows)
+        fresh = np.where(valid.any(axis=0), k - valid.argmax(axis=0), 0)
+        self.matrix = buf[:n + k]
+        self.lengths = np.where(self.lengths > 0, self.lengths + k, fresh)
+
+    def replace_last(self, row):
+        """
+        Ghi đè phiên cuối bằng row (N,) - dùng khi cùng 1 phiên được gửi lại nhiều lần trong ngày.
+        Ô NaN giữ giá hiện có của phiên cuối. Ma trận chỉ đọc (snapshot/shared memory) -> copy sang buffer riêng trước.
+        """
+        row = np.asarray(row, dtype=np.float64)
+        n = self.n_rows
+        if n == 0:
+            raise ValueError("Kho trống, không có phiên để ghi đè.")
+        if not self.matrix.flags.writeable:
+            buf = np.empty((n + max(n // 4, 64), len(self.tickers)), dtype=np.float64)
+            buf[:n] = self.matrix
+            self._buffer = buf
+            self.matrix = buf[:n]
+        valid = ~np.isnan(row)
+        self.matrix[-1] = np.where(valid, row, self.matrix[-1])
+        self.lengths = np.where((self.lengths == 0) & valid, 1, self.lengths)
+
+    # --- TRUY XUẤT ---
+    def __contains__(self, ticker):
+        return ticker in self.index
+
+    def __len__(self):
+        return len(self.tickers)
+
+    @property
+    def n_rows(self):
+        return self.matrix.shape[0]
+
+    @property
+    def nbytes(self):
+        return self.matrix.nbytes + self.lengths.nbytes
+
+    def length(self, ticker):
+        j = self.index.get(ticker)
+        return 0 if j is None else int(self.lengths[j])
+
+    def series(self, ticker):
+        """Toàn bộ lịch sử hợp lệ của 1 mã (view, không copy)."""
+        j = self.index[ticker]
+        return self.matrix[self.n_rows - self.lengths[j]:, j]
+
+    def tail(self, ticker, n):
+        """n phiên gần nhất của 1 mã (view)."""
+        j = self.index[ticker]
+        n = min(n, int(self.lengths[j]))
+        return self.matrix[self.n_rows - n:, j]
+
+    def columns(self, tickers):
+        """Chỉ số cột của danh sách mã (bỏ qua mã không có)."""
+        return np.array([self.index[t] for t in tickers if t in self.index], dtype=np.int64)
+
+    def to_dict(self):
+        """Xuất lại dạng {ticker: list} (chỉ dùng cho debug/export)."""
+        return {t: self.series(t).tolist() for t in self.tickers}
@@ -0,0 +1,297 @@
+import importlib.util
+import threading
+import time
+import zlib
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+# Lớp nguồn dữ liệu giá: mọi provider trả về CÙNG 1 schema OHLCV
+#   DataFrame index = ngày (DatetimeIndex, không timezone, tăng dần, không trùng)
+#   cột = open, high, low, close, volume (float64, giá theo VND)
+# Mã dùng dạng chuẩn của repo ("HPG.VN", "^VNINDEX"); mỗi provider tự đổi sang ký hiệu riêng.
+OHLCV_COLUMNS = ["open", "high", "low", "close", "volume"]
+INDEX_SYMBOLS = {"VNINDEX", "VN30", "HNXINDEX", "UPCOMINDEX"}
+
+def empty_ohlcv():
+    return pd.DataFrame({c: pd.Series(dtype=np.float64) for c in OHLCV_COLUMNS}, index=pd.DatetimeIndex([]))
+
+def normalize_ohlcv(df, rename=None, price_scale=1.0):
+    """Đưa DataFrame bất kỳ về schema OHLCV chuẩn (đổi tên cột, bỏ timezone, sắp xếp, nhân hệ số giá)."""
+    if df is None or len(df) == 0:
+        return empty_ohlcv()
+    df = df.rename(columns=rename or {})
+    df = df.rename(columns=str.lower)
+    if not set(OHLCV_COLUMNS) <= set(df.columns):
+        raise ValueError(f"Thiếu cột OHLCV: {sorted(set(OHLCV_COLUMNS) - set(df.columns))}")
+
+    index = pd.DatetimeIndex(pd.to_datetime(df.index), name=None)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    out = pd.DataFrame(df[OHLCV_COLUMNS].to_numpy(dtype=np.float64), index=index.normalize(), columns=OHLCV_COLUMNS)
+    out[["open", "high", "low", "close"]] *= price_scale
+    out = out[~out.index.duplicated(keep="last")].sort_index()
+    return out.dropna(subset=["close"])
+
+def base_symbol(ticker):
+    """'HPG.VN' -> 'HPG', '^VNINDEX' -> 'VNINDEX'."""
+    return ticker.upper().replace(".VN", "").lstrip("^")
+
+def period_start(period, today=None):
+    """Đổi period kiểu Yahoo ('5d', '6mo', '1y', 'ytd', 'max') thành ngày bắt đầu."""
+    today = today or date.today()
+    if period == "max":
+        return date(2000, 1, 1)
+    if period == "ytd":
+        return date(today.year, 1, 1)
+    for suffix, days in (("mo", 31), ("wk", 7), ("d", 1), ("y", 366)):
+        if period.endswith(suffix):
+            return today - timedelta(days=int(period[:-len(suffix)]) * days)
+    raise ValueError(f"Period không hỗ trợ: {period}")
+
+
+class RateLimiter:
+    """Token bucket thread-safe: trung bình `rate` request/giây, cho phép dồn tối đa `burst` request."""
+
+    def __init__(self, rate, burst=1, clock=time.monotonic, sleep=time.sleep):
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = float(burst)
+        self._last = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            self._tokens -= 1  # Âm = đã đặt chỗ trước, request này chờ phần nợ
+            wait_time = 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+        if wait_time > 0:
+            self._sleep(wait_time)
+
+
+class Provider:
+    """
+    Giao diện provider. Lớp con cài fetch(); fetch_many() mặc định chạy fetch() song song
+    (giới hạn max_concurrency + rate limiter nếu có), mã lỗi/không có dữ liệu bị bỏ khỏi kết quả.
+    """
+    name = "provider"
+    max_concurrency = 4
+    rate_limiter = None
+
+    def fetch(self, ticker, period):
+        raise NotImplementedError
+
+    def fetch_many(self, tickers, period):
+        def one(ticker):
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire()
+            try:
+                return ticker, self.fetch(ticker, period)
+            except Exception as e:
+                print(f"{self.name} fail {ticker}: {e}")
+                return ticker, empty_ohlcv()
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix=self.name) as pool:
+            return {t: df for t, df in pool.map(one, dict.fromkeys(tickers)) if len(df)}
+
+
+class YahooProvider(Provider):
+    """Yahoo Finance: 1 mã qua Ticker.history (an toàn đa luồng), nhiều mã gom 1 lượt yf.download."""
+    name = "yahoo"
+
+    def fetch(self, ticker, period):
+        import yfinance as yf
+        return normalize_ohlcv(yf.Ticker(ticker).history(period=period, auto_adjust=True))
+
+    def fetch_many(self, tickers, period):
+        import yfinance as yf
+        from core_engine.price_fetcher import _YF_DOWNLOAD_LOCK
+
+        tickers = list(dict.fromkeys(tickers))
+        with _YF_DOWNLOAD_LOCK:
+            df = yf.download(tickers, period=period, progress=False, auto_adjust=True, group_by="ticker")
+        if df is None or df.empty:
+            return {}
+        if not isinstance(df.columns, pd.MultiIndex):
+            return {tickers[0]: normalize_ohlcv(df)}
+        frames = {t: normalize_ohlcv(df[t]) for t in tickers if t in df.columns.get_level_values(0)}
+        return {t: f for t, f in frames.items() if len(f)}
+
+
+class VnstockProvider(Provider):
+    """
+    vnstock (nguồn VCI): chỉ có API từng mã -> tải song song có giới hạn thay vì tuần tự + sleep(1).
+    Giá cổ phiếu VCI tính theo nghìn đồng -> nhân 1000 cho khớp Yahoo (chỉ số giữ nguyên điểm).
+    """
+    name = "vnstock"
+
+    def __init__(self, source="VCI", rate_per_sec=1.0, burst=5, max_concurrency=4):
+        self.source = source
+        self.rate_limiter = RateLimiter(rate_per_sec, burst)
+        self.max_concurrency = max_concurrency
+
+    def fetch(self, ticker, period):
+        from vnstock import Vnstock  # Phụ thuộc tùy chọn: chỉ import khi thực sự dùng
+        symbol = base_symbol(ticker)
+        stock = Vnstock().stock(symbol=symbol, source=self.source)
+        df = stock.quote.history(start=period_start(period).isoformat(), end=date.today().isoformat(), interval="1D")
+        if df is None or len(df) == 0:
+            return empty_ohlcv()
+        return normalize_ohlcv(df.set_index("time"), price_scale=1.0 if symbol in INDEX_SYMBOLS else 1000.0)
+
+
+class FakeProvider(Provider):
+    """
+    Provider cục bộ cho test/offline: frames có sẵn {ticker: DataFrame OHLCV} hoặc random walk tất định theo mã.
+    latency: giây (hoặc hàm(ticker) -> giây) mỗi request; fail: tập mã luôn lỗi.
+    """
+
+    def __init__(self, frames=None, latency=0.0, fail=(), n_days=260, name="fake", max_concurrency=8):
+        self.frames = frames or {}
+        self.latency = latency
+        self.fail = set(fail)
+        self.n_days = n_days
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.calls = 0
+
+    def fetch(self, ticker, period):
+        self.calls += 1
+        delay = self.latency(ticker) if callable(self.latency) else self.latency
+        if delay:
+            time.sleep(delay)
+        if ticker in self.fail:
+            raise RuntimeError(f"{self.name}: lỗi giả lập cho {ticker}")
+        if ticker in self.frames:
+            return normalize_ohlcv(self.frames[ticker])
+        return self._random_walk(ticker)
+
+    def _random_walk(self, ticker):
+        rng = np.random.default_rng(zlib.crc32(ticker.encode("utf-8")))
+        dates = pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=self.n_days)
+        close = 20000 * np.exp(np.cumsum(rng.normal(0, 0.015, self.n_days)))
+        spread = close * rng.uniform(0, 0.02, self.n_days)
+        return normalize_ohlcv(pd.DataFrame({
+            "open": close * (1 + rng.normal(0, 0.005, self.n_days)),
+            "high": close + spread, "low": close - spread, "close": close,
+            "volume": rng.integers(1e5, 5e6, self.n_days).astype(np.float64),
+        }, index=dates))
+
+
+class HedgedProvider(Provider):
+    """
+    Gửi request tới primary; nếu sau `hedge_after` giây chưa xong (hoặc lỗi / thiếu mã) thì gửi thêm
+    request "hedge" tới secondary cho các mã còn thiếu, lấy kết quả về trước.
+    hedge_after tự thích nghi: p95 độ trễ gần đây của primary (trong khoảng [min_hedge, max_hedge]),
+    đo riêng cho request 1 mã (fetch) và request cả rổ (fetch_many) - lượt tải 67 mã không kéo dài độ trễ hedge của 1 mã.
+    fetch() đi thẳng primary.fetch / secondary.fetch (Yahoo: Ticker.history song song, không vào lock yf.download).
+    """
+
+    def __init__(self, primary, secondary, hedge_after=2.0, min_hedge=0.2, max_hedge=10.0, max_workers=8):
+        self.primary = primary
+        self.secondary = secondary
+        self.name = f"{primary.name}+{secondary.name}"
+        self.hedge_after = hedge_after
+        self.min_hedge = min_hedge
+        self.max_hedge = max_hedge
+        self._latencies = {"single": deque(maxlen=50), "batch": deque(maxlen=50)}
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="hedged")
+        self.hedges = 0
+
+    def hedge_delay(self, kind="batch"):
+        latencies = self._latencies[kind]
+        if len(latencies) < 10:
+            return self.hedge_after
+        return float(np.clip(np.quantile(latencies, 0.95), self.min_hedge, self.max_hedge))
+
+    def _timed(self, kind, fn, *args):
+        start = time.monotonic()
+        result = fn(*args)
+        self._latencies[kind].append(time.monotonic() - start)
+        return result
+
+    def fetch(self, ticker, period):
+        pending = {self._executor.submit(self._timed, "single", self.primary.fetch, ticker, period)}
+        hedged = False
+        while pending:
+            done, pending = wait(pending, timeout=None if hedged else self.hedge_delay("single"), return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    df = future.result()
+                except Exception as e:
+                    print(f"{self.name} fail {ticker}: {e}")
+                    continue
+                if len(df):
+                    return df
+            if not hedged:
+                hedged = True
+                self.hedges += 1
+                pending.add(self._executor.submit(self.secondary.fetch, ticker, period))
+        return empty_ohlcv()
+
+    def fetch_many(self, tickers, period):
+        tickers = list(dict.fromkeys(tickers))
+        results = {}
+        pending = {self._executor.submit(self._timed, "batch", self.primary.fetch_many, tickers, period)}
+        hedged = False
+        while pending:
+            done, pending = wait(pending, timeout=None if hedged else self.hedge_delay("batch"), return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    frames = future.result()
+                except Exception as e:
+                    print(f"{self.name} fail: {e}")
+                    frames = {}
+                for t, df in frames.items():
+                    if len(df) and t not in results:
+                        results[t] = df
+            missing = [t for t in tickers if t not in results]
+            if not missing:
+                break  # Đủ mã -> trả về ngay, request còn lại chạy nốt trong nền rồi bị bỏ
+            if not hedged:
+                hedged = True
+                self.hedges += 1
+                pending.add(self._executor.submit(self.secondary.fetch_many, missing, period))
+        return results
+
+
+def build_provider(spec="yahoo,vnstock", hedge_after=2.0):
+    """
+    Dựng provider từ chuỗi cấu hình: "yahoo", "vnstock", "fake" hoặc "primary,secondary" (hedged).
+    vnstock chưa cài -> bỏ qua (chỉ dùng provider còn lại).
+    """
+    providers = []
+    for name in (s.strip().lower() for s in spec.split(",") if s.strip()):
+        if name == "yahoo":
+            providers.append(YahooProvider())
+        elif name == "vnstock":
+            if importlib.util.find_spec("vnstock") is None:
+                print("vnstock chưa được cài, bỏ qua provider vnstock.")
+                continue
+            providers.append(VnstockProvider())
+        elif name == "fake":
+            providers.append(FakeProvider())
+        else:
+            raise ValueError(f"Provider không hỗ trợ: {name}")
+    if not providers:
+        providers.append(YahooProvider())
+    if len(providers) == 1:
+        return providers[0]
+    return HedgedProvider(providers[0], providers[1], hedge_after=hedge_after)
+
+def close_download_fns(provider):
+    """(download_fn, download_many_fn) cho PriceFetcher: giá đóng cửa lấy từ provider (dữ liệu ngày)."""
+    def download_close(ticker, period, interval="1d"):
+        return provider.fetch(ticker, period)["close"].to_numpy(dtype=np.float64)
+
+    def download_close_many(tickers, period, interval="1d"):
+        return {t: df["close"].to_numpy(dtype=np.float64) for t, df in provider.fetch_many(tickers, period).items()}
+
+    return download_close, download_close_many
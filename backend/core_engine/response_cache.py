@@ -0,0 +1,59 @@
+import hashlib
+import json
+
+class ResponseCache:
+    """
+    Cache response đã encode sẵn thành JSON bytes, dựng lại 1 lần mỗi khi dữ liệu thay đổi.
+    ETag sinh từ (last_updated, version) -> client gửi If-None-Match khớp sẽ nhận 304.
+    bodies + ETag là 1 tuple bất biến gán 1 lần: endpoint sync (threadpool) đọc lookup() 1 lần nên không bao giờ
+    ghép body cũ với ETag mới khi install() chạy song song.
+    """
+
+    def __init__(self):
+        self.version = 0
+        self._snapshot = ({}, None)  # (bodies, etag)
+
+    @property
+    def etag(self):
+        return self._snapshot[1]
+
+    @staticmethod
+    def encode(payloads):
+        """
+        payloads: {key: object JSON-serializable} -> {key: bytes}. Tách khỏi install() để encode (có thể lỗi,
+        VD: NaN) chạy TRƯỚC khi đổi dữ liệu đang phục vụ.
+        """
+        # Encode giống JSONResponse của Starlette để nội dung y hệt bản không cache
+        return {
+            key: json.dumps(obj, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+            for key, obj in payloads.items()
+        }
+
+    def publish(self, payloads, stamp, version=None):
+        """Encode rồi install trong 1 bước."""
+        self.install(self.encode(payloads), stamp, version)
+
+    def install(self, bodies, stamp, version=None):
+        """
+        Thay toàn bộ cache bằng bodies đã encode trong 1 lần gán.
+        version: version dữ liệu dùng chung giữa các worker (mặc định tự tăng trong process).
+        """
+        self.version = self.version + 1 if version is None else version
+        digest = hashlib.sha1(f"{stamp}|{self.version}".encode("utf-8")).hexdigest()[:16]
+        self._snapshot = (bodies, f'"{digest}"')
+
+    def lookup(self, key):
+        """(body, etag) của cùng 1 phiên bản dữ liệu; body = None nếu chưa có."""
+        bodies, etag = self._snapshot
+        return bodies.get(key), etag
+
+    def get(self, key):
+        return self._snapshot[0].get(key)
+
+    def matches(self, if_none_match, etag=None):
+        """Kiểm tra header If-None-Match (hỗ trợ danh sách, tiền tố W/ và *) với etag (mặc định ETag hiện tại)."""
+        etag = etag or self.etag
+        if not if_none_match or etag is None:
+            return False
+        tags = [t.strip() for t in if_none_match.split(",")]
+        return "*" in tags or any(t.removeprefix("W/") == etag for t in tags)
@@ -0,0 +1,37 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+RRG_WINDOW = 10
+
+def compute_rrg(prices, bench_prices, tail=1, window=RRG_WINDOW):
+    """
+    Tính RRG cho toàn bộ rổ mã trong 1 lượt ma trận (thay cho vòng lặp từng mã).
+    Công thức giữ nguyên như bản per-ticker:
+        RS          = 100 * P / Benchmark
+        RS_Ratio    = 100 * RS / MA_window(RS)
+        RS_Momentum = 100 * RS_Ratio / RS_Ratio(t-1)
+
+    Args:
+        prices (np.array): Ma trận giá (T, N), căn lề phải theo phiên mới nhất.
+        bench_prices (np.array): Chuỗi giá benchmark (T,), cùng trục thời gian.
+        tail (int): Số phiên cuối cần trả về.
+        window (int): Cửa sổ MA của RS.
+
+    Returns:
+        (rs_ratio, rs_momentum): Hai ma trận (tail, N). Phiên thiếu dữ liệu = NaN.
+    """
+    # Chỉ cần (tail + window) hàng cuối: window-1 hàng cho MA, +1 hàng cho shift của Momentum
+    need = tail + window
+    p = prices[-need:]
+    b = bench_prices[-need:]
+    if len(p) < need:
+        pad = need - len(p)
+        p = np.vstack([np.full((pad, p.shape[1]), np.nan), p])
+        b = np.concatenate([np.full(pad, np.nan), b])
+
+    rs = 100 * (p / b[:, None])
+    # MA trượt: NaN nếu cửa sổ còn thiếu dữ liệu (giống rolling(window).mean() của pandas)
+    rs_ma = sliding_window_view(rs, window, axis=0).mean(axis=-1)
+    rs_ratio = (rs[window - 1:] / rs_ma) * 100
+    rs_momentum = (rs_ratio[1:] / rs_ratio[:-1]) * 100
+    return rs_ratio[1:], rs_momentum
@@ -0,0 +1,48 @@
+import glob
+import os
+
+# Danh sách mã theo ngành: các file RRG_<Nhom>.txt ở thư mục gốc repo (mỗi file 1 dòng, mã cách nhau bởi dấu phẩy)
+SECTOR_FILE_PATTERN = "RRG_*.txt"
+DEFAULT_SECTOR_DIR = os.environ.get(
+    "SECTOR_DIR", os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+)
+
+def load_sector_map(directory=None):
+    """
+    Đọc các file RRG_*.txt -> {nhóm: [mã không hậu tố .VN]}, nhóm xếp theo tên file.
+    VD: RRG_Ngan_hang.txt -> "Ngan_hang": ["VCB", "BID", ...]
+    """
+    directory = directory or DEFAULT_SECTOR_DIR
+    sector_map = {}
+    for path in sorted(glob.glob(os.path.join(directory, SECTOR_FILE_PATTERN))):
+        group = os.path.splitext(os.path.basename(path))[0][len("RRG_"):]
+        with open(path, encoding="utf-8") as f:
+            tickers = [t.strip().upper() for t in f.read().replace("\n", ",").split(",")]
+        sector_map[group] = [t for t in tickers if t]
+    return sector_map
+
+def base_ticker(ticker):
+    return ticker.upper().replace(".VN", "")
+
+def assign_groups(tickers, sector_map):
+    """
+    Gán mỗi mã vào ĐÚNG 1 nhóm: nhóm đầu tiên (theo thứ tự sector_map) có chứa mã.
+    Mã thuộc nhiều file (VD: vừa ngành vừa VN30_Bluechip) lấy nhóm ngành vì xếp trước theo tên.
+    Trả về {index mã: nhóm}, mã không thuộc nhóm nào bị bỏ qua.
+    """
+    owner = {}
+    for group, members in sector_map.items():
+        for t in members:
+            owner.setdefault(base_ticker(t), group)
+    return {i: owner[base_ticker(t)] for i, t in enumerate(tickers) if base_ticker(t) in owner}
+
+def group_memberships(tickers, sector_map):
+    """
+    Mọi nhóm chứa mỗi mã (theo thứ tự sector_map) - 1 mã có thể nằm trong nhiều rổ RRG.
+    Trả về {index mã: [nhóm]}, mã không thuộc nhóm nào bị bỏ qua.
+    """
+    members = {}
+    for group, tickers_in_group in sector_map.items():
+        for t in dict.fromkeys(base_ticker(t) for t in tickers_in_group):
+            members.setdefault(t, []).append(group)
+    return {i: members[base_ticker(t)] for i, t in enumerate(tickers) if base_ticker(t) in members}
@@ -0,0 +1,163 @@
+import contextlib
+import mmap
+import os
+import struct
+import tempfile
+import time
+
+import numpy as np
+
+from core_engine import matrix_codec
+from core_engine.price_store import PriceStore
+
+try:
+    import fcntl  # POSIX: file lock tuần tự hóa publish giữa các worker
+except ImportError:
+    fcntl = None  # Windows: không có -> main.py giữ kho trong RAM của process (SHARED_MEMORY_AVAILABLE = False)
+SHARED_MEMORY_AVAILABLE = fcntl is not None
+
+# Data plane chỉ đọc dùng chung cho nhiều worker uvicorn, đặt trên tmpfs /dev/shm (POSIX shared memory của Linux):
+# - File điều khiển "<name>.ctl" (nhỏ, cố định): [seq][version][tên file dữ liệu], ghi theo seqlock
+#   (seq lẻ = đang ghi; reader đọc lại nếu seq lẻ hoặc đổi) -> reader không bao giờ thấy version/tên lệch nhau.
+# - Mỗi version 1 file dữ liệu "<name>_<version>.qmx" bất biến: payload QMX1 (header kèm meta + ma trận float64).
+#   Worker mmap thẳng ma trận (zero-copy, chung page) -> N worker vẫn chỉ 1 bản dữ liệu trong RAM.
+# Dùng mmap file thay cho multiprocessing.shared_memory: segment không bị resource_tracker của worker nào
+# unlink khi worker đó thoát/restart.
+SHM_DIR = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+
+_SEQ = struct.Struct("<Q")
+_BODY = struct.Struct("<QH64s")  # version, độ dài tên, tên file dữ liệu
+CONTROL_SIZE = _SEQ.size + _BODY.size
+
+def _create_mapping(path, size):
+    fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_EXCL, 0o600)
+    try:
+        os.ftruncate(fd, size)
+        return mmap.mmap(fd, size)
+    finally:
+        os.close(fd)
+
+def _open_mapping(path, writable=False):
+    fd = os.open(path, os.O_RDWR if writable else os.O_RDONLY)
+    try:
+        return mmap.mmap(fd, 0, access=mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ)
+    finally:
+        os.close(fd)
+
+def _remove(path):
+    try: os.remove(path)
+    except FileNotFoundError: pass
+
+
+class SharedOracle:
+    """
+    Phát hành/đọc kho giá Oracle qua shared memory theo version.
+    - publish(): worker nhận upload/append ghi version mới (tuần tự giữa các process bằng file lock).
+    - poll(): worker khác thấy version đổi -> map file mới, trả về PriceStore chỉ đọc + meta.
+    File version cũ bị xóa ngay khi có version mới; worker nào còn map vẫn đọc được tới khi bỏ view.
+    """
+
+    def __init__(self, name, directory=None):
+        self.name = name
+        self.directory = directory or SHM_DIR
+        self.version = 0          # Version worker này đang dùng
+        self._mapping = None      # mmap dữ liệu đang dùng
+        self._retired = []        # mmap cũ còn view numpy trỏ vào -> đóng khi hết view
+        self._lock_path = os.path.join(self.directory, f"{name}.lock")
+
+        control_path = os.path.join(self.directory, f"{name}.ctl")
+        with self._locked():
+            try:
+                self._control = _create_mapping(control_path, CONTROL_SIZE)
+            except FileExistsError:
+                self._control = _open_mapping(control_path, writable=True)
+
+    @contextlib.contextmanager
+    def _locked(self):
+        with open(self._lock_path, "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    # --- FILE ĐIỀU KHIỂN (SEQLOCK) ---
+    def read_control(self):
+        """(version, tên file dữ liệu) đang phát hành; (0, "") nếu chưa có."""
+        buf = self._control
+        while True:
+            seq = _SEQ.unpack_from(buf, 0)[0]
+            if seq % 2 == 0:
+                version, n, raw = _BODY.unpack_from(buf, _SEQ.size)
+                if _SEQ.unpack_from(buf, 0)[0] == seq:
+                    return version, raw[:n].decode("ascii")
+            time.sleep(0)
+
+    def _write_control(self, version, data_name):
+        buf = self._control
+        seq = _SEQ.unpack_from(buf, 0)[0]
+        _SEQ.pack_into(buf, 0, seq + 1)
+        name = data_name.encode("ascii")
+        _BODY.pack_into(buf, _SEQ.size, version, len(name), name)
+        _SEQ.pack_into(buf, 0, seq + 2)
+
+    # --- PHÁT HÀNH ---
+    def publish(self, store, meta):
+        """
+        Ghi store + meta (JSON) vào file version mới rồi lật file điều khiển sang đó.
+        Trả về (version, PriceStore chỉ đọc trên shared memory) để worker phát hành cũng bỏ bản riêng.
+        """
+        header = matrix_codec.encode_header(store.tickers, store.n_rows, store.lengths, meta)
+        matrix = np.ascontiguousarray(store.matrix, dtype="<f8")
+        with self._locked():
+            old_version, old_name = self.read_control()
+            version = old_version + 1
+            data_name = f"{self.name}_{version}.qmx"
+            path = os.path.join(self.directory, data_name)
+            _remove(path)  # Sót lại từ lần chạy trước bị ngắt giữa chừng
+
+            mapping = _create_mapping(path, len(header) + matrix.nbytes)
+            mapping[:len(header)] = header
+            out = np.ndarray(matrix.shape, dtype="<f8", buffer=mapping, offset=len(header))
+            out[:] = matrix
+            del out
+            mapping.close()
+
+            self._write_control(version, data_name)
+            if old_name:
+                _remove(os.path.join(self.directory, old_name))
+
+            _, store, _ = self._adopt(version, _open_mapping(path))
+        return version, store
+
+    # --- ĐỌC ---
+    def poll(self):
+        """Có version mới hơn bản đang dùng -> (version, PriceStore chỉ đọc, meta); không thì None."""
+        version, data_name = self.read_control()
+        if version == self.version or not data_name:
+            return None
+        try:
+            mapping = _open_mapping(os.path.join(self.directory, data_name))
+        except FileNotFoundError:
+            return None  # Vừa bị thay bởi version mới hơn -> lần poll sau sẽ thấy
+        return self._adopt(version, mapping)
+
+    def _adopt(self, version, mapping):
+        # mmap ACCESS_READ -> ma trận chỉ đọc: append() sẽ copy sang buffer riêng thay vì ghi vào bản dùng chung
+        header, _ = matrix_codec.read_header(mapping)
+        tickers, matrix, lengths = matrix_codec.decode_matrix(mapping)
+
+        if self._mapping is not None:
+            self._retired.append(self._mapping)
+        self._mapping, self.version = mapping, version
+        self._close_retired()
+        return version, PriceStore(matrix, tickers, lengths), header.get("extra") or {}
+
+    def _close_retired(self):
+        still_mapped = []
+        for mapping in self._retired:
+            try:
+                mapping.close()
+            except BufferError:
+                still_mapped.append(mapping)  # Request cũ còn giữ view
+        self._retired = still_mapped
@@ -0,0 +1,162 @@
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from core_engine.ntf_engine import rolling_network_momentum
+from core_engine.ops_engine import backtest_exponential_gradient
+
+# Quét tham số OPS (learning_rate, alpha) và NTF (lookback_window, corr_window, step) trên nhiều process.
+# Ma trận lợi nhuận nằm trong 1 segment shared memory: worker map lại đúng vùng nhớ đó (zero-copy),
+# task chỉ mang tham số -> không pickle (T × N) cho từng task/worker. Worker chỉ trả về vài chỉ số, không trả wealth.
+
+PERIODS_PER_YEAR = 252
+
+# State của từng worker process (gắn 1 lần trong initializer)
+_WORKER = {}
+
+# --- SHARED MEMORY ---
+def _share_matrix(matrix):
+    """Chép ma trận vào segment shared memory mới. Trả về (segment, spec để worker gắn lại)."""
+    matrix = np.ascontiguousarray(matrix, dtype=np.float64)
+    segment = shared_memory.SharedMemory(create=True, size=max(matrix.nbytes, 1))
+    np.ndarray(matrix.shape, dtype=np.float64, buffer=segment.buf)[:] = matrix
+    return segment, {"name": segment.name, "shape": matrix.shape}
+
+def _attach_matrix(spec):
+    segment = shared_memory.SharedMemory(name=spec["name"])
+    # Worker của pool dùng CHUNG resource_tracker với process cha (fork lẫn spawn) -> đăng ký lại là no-op,
+    # KHÔNG unregister (sẽ xóa luôn đăng ký của cha). Chỉ process cha unlink segment, trong _run_pool.
+    matrix = np.ndarray(spec["shape"], dtype=np.float64, buffer=segment.buf)
+    matrix.flags.writeable = False
+    return segment, matrix
+
+def _init_worker(spec, context):
+    segment, returns = _attach_matrix(spec)
+    _WORKER.update(context)
+    _WORKER["segment"] = segment  # Giữ tham chiếu: segment bị đóng thì view numpy thành vùng nhớ treo
+    _WORKER["returns"] = returns
+
+# --- CHỈ SỐ HIỆU QUẢ ---
+def performance_metrics(wealth, periods_per_year=PERIODS_PER_YEAR):
+    """
+    Chỉ số từ đường tài sản (P, T) với vốn ban đầu = 1.
+    Returns: dict các mảng (P,): total_return, sharpe (năm hóa), max_drawdown (số âm).
+    """
+    wealth = np.atleast_2d(np.asarray(wealth, dtype=np.float64))
+    curve = np.concatenate([np.ones((len(wealth), 1)), wealth], axis=1)
+    period_returns = curve[:, 1:] / curve[:, :-1] - 1
+
+    mean = period_returns.mean(axis=1)
+    std = period_returns.std(axis=1)
+    sharpe = np.where(std > 0, mean / np.where(std > 0, std, 1) * np.sqrt(periods_per_year), 0.0)
+    drawdown = curve / np.maximum.accumulate(curve, axis=1) - 1
+    return {
+        "total_return": curve[:, -1] - 1,
+        "sharpe": sharpe,
+        "max_drawdown": drawdown.min(axis=1),
+    }
+
+def _metric_rows(params, wealth, turnover):
+    metrics = performance_metrics(wealth, _WORKER.get("periods_per_year", PERIODS_PER_YEAR))
+    return [dict(p, turnover=float(turnover[i]), **{k: float(v[i]) for k, v in metrics.items()})
+            for i, p in enumerate(params)]
+
+# --- TASK TRONG WORKER ---
+def _ops_task(learning_rates, alpha):
+    """1 task = 1 alpha × 1 lô eta: backtest_exponential_gradient vốn đã batch theo eta."""
+    result = backtest_exponential_gradient(_WORKER["returns"], learning_rates, (alpha,), _WORKER.get("group_mapping"))
+    params = [{"learning_rate": float(eta), "alpha": float(alpha)} for eta in result["learning_rate"]]
+    return _metric_rows(params, result["wealth"], result["turnover"])
+
+def _ntf_task(lookback_window, corr_window, step):
+    """
+    1 task = 1 bộ (lookback_window, corr_window, step). Chiến lược long-only: tại mỗi phiên dựng Network,
+    tỷ trọng = phần dương của tín hiệu Spillover (chuẩn hóa tổng 1, toàn âm -> giữ tiền mặt),
+    nắm giữ tới lần dựng tiếp theo.
+    """
+    returns = _WORKER["returns"]
+    T, N = returns.shape
+    signals = rolling_network_momentum(pd.DataFrame(returns), lookback_window, corr_window, step)
+
+    wealth = np.ones(T)
+    weights = np.zeros(N)
+    capital, turnover = 1.0, 0.0
+    rebalance = dict(zip(signals.index, signals.values))
+    for t in range(T):
+        # Lợi nhuận phiên t dùng tỷ trọng chốt cuối phiên trước (không nhìn trước)
+        r_t = returns[t]
+        portfolio_return = weights @ r_t
+        capital *= 1 + portfolio_return
+        wealth[t] = capital
+        drifted = weights * (1 + r_t)
+        drifted = drifted / (1 + portfolio_return) if weights.any() else drifted
+
+        signal = rebalance.get(t)
+        if signal is not None:
+            positive = np.nan_to_num(np.maximum(signal, 0))
+            target = positive / positive.sum() if positive.sum() > 0 else np.zeros(N)
+            turnover += 0.5 * np.abs(target - drifted).sum()
+            weights = target
+        else:
+            weights = drifted
+
+    params = [{"lookback_window": lookback_window, "corr_window": corr_window, "step": step}]
+    return _metric_rows(params, wealth[None, :], [turnover / max(T, 1)])
+
+# --- ĐIỀU PHỐI ---
+def _run_pool(returns, tasks, context, max_workers):
+    """Chạy các task (fn, args) trên process pool dùng chung ma trận lợi nhuận qua shared memory."""
+    segment, spec = _share_matrix(returns)
+    try:
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                                 initargs=(spec, context)) as pool:
+            futures = [pool.submit(fn, *args) for fn, args in tasks]
+            rows = [row for f in futures for row in f.result()]
+    finally:
+        segment.close()
+        segment.unlink()
+    return rows
+
+def _ranked(rows, sort_by):
+    table = pd.DataFrame(rows)
+    if table.empty:
+        return table
+    table = table.sort_values(sort_by, ascending=False, kind="stable").reset_index(drop=True)
+    table.insert(0, "rank", np.arange(1, len(table) + 1))
+    return table
+
+def sweep_ops(returns, learning_rates, alphas=(0.0,), group_mapping=None, max_workers=None,
+              periods_per_year=PERIODS_PER_YEAR, sort_by="sharpe"):
+    """
+    Quét lưới (learning_rate × alpha) cho Exponential Gradient trên mọi core.
+    Mỗi alpha được chia thành vài lô eta để đủ task cho các worker; mỗi lô chạy 1 lần backtest batched.
+
+    Returns:
+        pd.DataFrame xếp hạng theo `sort_by`: rank, learning_rate, alpha, turnover, total_return, sharpe, max_drawdown.
+    """
+    returns = np.asarray(returns, dtype=np.float64)
+    learning_rates = np.asarray(learning_rates, dtype=np.float64)
+    max_workers = max_workers or os.cpu_count() or 1
+    n_chunks = min(len(learning_rates), max(1, -(-max_workers // len(alphas))))
+    tasks = [(_ops_task, (chunk, float(alpha)))
+             for alpha in alphas for chunk in np.array_split(learning_rates, n_chunks) if len(chunk)]
+    context = {"group_mapping": group_mapping, "periods_per_year": periods_per_year}
+    return _ranked(_run_pool(returns, tasks, context, max_workers), sort_by)
+
+def sweep_ntf(returns, lookback_windows, corr_windows=(60,), steps=(1,), max_workers=None,
+              periods_per_year=PERIODS_PER_YEAR, sort_by="sharpe"):
+    """
+    Quét lưới (lookback_window × corr_window × step) cho NTF rolling, mỗi bộ tham số là 1 task.
+
+    Returns:
+        pd.DataFrame xếp hạng theo `sort_by`: rank, lookback_window, corr_window, step, turnover, total_return, sharpe, max_drawdown.
+    """
+    returns = np.asarray(returns, dtype=np.float64)
+    tasks = [(_ntf_task, (int(lb), int(cw), int(st)))
+             for lb, cw, st in itertools.product(lookback_windows, corr_windows, steps)]
+    context = {"periods_per_year": periods_per_year}
+    return _ranked(_run_pool(returns, tasks, context, max_workers), sort_by)
@@ -0,0 +1,78 @@
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+class TTLLRUCache:
+    """
+    Cache có giới hạn theo byte: hết hạn theo TTL + loại bỏ mục ít dùng nhất (LRU) khi vượt ngân sách.
+    Thread-safe. Kích thước mỗi mục lấy từ .nbytes (numpy/pandas) hoặc sys.getsizeof.
+    """
+
+    def __init__(self, max_bytes, ttl_seconds, clock=time.monotonic):
+        self.max_bytes = int(max_bytes)
+        self.ttl = float(ttl_seconds)
+        self._clock = clock
+        self._entries = OrderedDict()  # key -> (expires_at, value, nbytes)
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[0] <= self._clock():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, value, nbytes=None):
+        if nbytes is None:
+            nbytes = getattr(value, "nbytes", None) or sys.getsizeof(value)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            if nbytes > self.max_bytes:
+                return False  # Lớn hơn cả ngân sách -> không cache
+            while self.bytes + nbytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+            self._entries[key] = (self._clock() + self.ttl, value, nbytes)
+            self.bytes += nbytes
+            return True
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def _remove(self, key):
+        _, _, nbytes = self._entries.pop(key)
+        self.bytes -= nbytes
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
@@ -1,14 +1,42 @@
 # FILE: backend/main.py (STABLE RESTORE POINT - FORCED REDEPLOY)
 from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-import pandas as pd
+from fastapi.responses import JSONResponse
 import numpy as np
 import json
+import os
+import time
+import asyncio
+import contextlib
 from datetime import datetime
 import pytz
-import yfinance as yf
 
-app = FastAPI()
+from core_engine.price_store import PriceStore
+from core_engine.incremental import OracleState
+from core_engine.ingest import NDJSONIngestor
+from core_engine import matrix_codec
+from core_engine.response_cache import ResponseCache
+from core_engine.price_fetcher import PriceFetcher
+from core_engine.persistence import SnapshotWriter, load_snapshot
+from core_engine.shared_oracle import SharedOracle, SHARED_MEMORY_AVAILABLE
+from core_engine.oracle_sources import ProviderSource, FileSource, default_universe
+from core_engine.rrg_engine import RRG_WINDOW, compute_rrg
+from core_engine.breadth import compute_breadth
+from core_engine.features import FeatureState
+from core_engine.model_service import ModelService, signal_label
+from core_engine.chart_engine import ChartService, CHART_RANGES, DEFAULT_BINS, DEFAULT_POINTS, MIN_BINS, MAX_BINS, MIN_POINTS, MAX_POINTS
+from core_engine.sectors import load_sector_map, group_memberships
+from core_engine.providers import build_provider, close_download_fns
+from core_engine.oracle_refresh import DailySchedule, OracleScheduler
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    start_oracle_scheduler(asyncio.get_running_loop())
+    yield
+    if ORACLE_SCHEDULER is not None: ORACLE_SCHEDULER.stop()
+    if SNAPSHOT_WRITER is not None: SNAPSHOT_WRITER.flush()
+
+app = FastAPI(lifespan=lifespan)
 
 # Cấu hình CORS mở rộng tối đa
 app.add_middleware(
@@ -16,16 +44,88 @@ app.add_middleware(
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
 
 # KHO DỮ LIỆU RAM
 ORACLE_DATA_STORE = {
     "status": "waiting",
-    "data": {},        
+    "store": PriceStore(),   # Ma trận giá (ngày × mã) thay cho dict-of-lists
+    "state": None,           # Running state RRG/MA20 cho append từng phiên
+    "features": None,        # Feature kỹ thuật phiên mới nhất của mọi mã (RSI, MACD, Bollinger...) cho AI Oracle
     "rrg_cache": [],   
-    "last_updated": None
+    "last_updated": None,
+    "refreshed_at": 0,       # Epoch lần dữ liệu được làm mới gần nhất (scheduler dùng để biết dữ liệu cũ)
+    "oracle_base": None,     # MA200 / price_t20 / mom_history / breadth_t1 từ lượt làm mới theo lịch
+    "last_session": None,    # Ngày (YYYY-MM-DD) của phiên cuối trong kho: delta cùng ngày ghi đè thay vì nối thêm
+    "breadth": {},           # Độ rộng thị trường của phiên bản dữ liệu hiện tại (tính lại khi kho đổi)
+    "signals": {},           # {mã: xác suất TĂNG} của AI model cho phiên bản dữ liệu hiện tại
 }
 
+# Response JSON encode sẵn cho các endpoint bị poll liên tục (dựng lại mỗi lần upload)
+RESPONSE_CACHE = ResponseCache()
+
+# Nguồn giá: provider đầu là chính, provider thứ 2 nhận request "hedge" khi provider chính chậm/lỗi/thiếu mã
+# PRICE_PROVIDERS: "yahoo,vnstock" (mặc định), "vnstock,yahoo", "yahoo", "fake" (offline/test)
+PRICE_PROVIDER = build_provider(
+    os.environ.get("PRICE_PROVIDERS", "yahoo,vnstock"),
+    hedge_after=float(os.environ.get("PRICE_HEDGE_AFTER", "2.0")),
+)
+
+# Tải on-demand cho mã ngoài Oracle (thread pool + gộp request trùng), giữ kết quả trong cache TTL + LRU
+# Ngân sách RAM cấu hình qua biến môi trường (mặc định 32MB, TTL 5 phút) để không vượt giới hạn 512MB
+PRICE_FETCHER = PriceFetcher(
+    *close_download_fns(PRICE_PROVIDER),
+    cache_max_bytes=int(float(os.environ.get("LIVE_CACHE_MAX_MB", "32")) * 1024 * 1024),
+    cache_ttl=float(os.environ.get("LIVE_CACHE_TTL", "300")),
+)
+
+# Chart OHLCV + Volume Profile: tải OHLCV qua cùng provider, cache JSON theo (mã, range, bins, points)
+CHART_SERVICE = ChartService(
+    PRICE_PROVIDER,
+    cache_max_bytes=int(float(os.environ.get("CHART_CACHE_MAX_MB", "16")) * 1024 * 1024),
+    cache_ttl=float(os.environ.get("LIVE_CACHE_TTL", "300")),
+)
+
+# Snapshot Oracle trên đĩa (memory-map) để restart/redeploy không rơi về "waiting". Đặt rỗng để tắt.
+ORACLE_CACHE_DIR = os.environ.get("ORACLE_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".oracle_cache"))
+# Snapshot ghi trong thread riêng; các append trong ORACLE_PERSIST_DELAY giây gộp thành 1 lần ghi cả ma trận
+ORACLE_PERSIST_DELAY = float(os.environ.get("ORACLE_PERSIST_DELAY", "30"))
+SNAPSHOT_WRITER = SnapshotWriter(ORACLE_CACHE_DIR) if ORACLE_CACHE_DIR else None
+
+# Nhiều worker uvicorn: kho giá + cache dẫn xuất phát hành qua shared memory theo version, mọi worker map chung
+# 1 bản chỉ đọc. Rỗng (mặc định, 1 process) = giữ toàn bộ state trong RAM của process như cũ.
+# Cần fcntl (Linux/macOS); Windows -> bỏ qua, lùi về kho trong RAM của process.
+ORACLE_SHM_NAME = os.environ.get("ORACLE_SHM_NAME", "")
+if ORACLE_SHM_NAME and not SHARED_MEMORY_AVAILABLE:
+    print("ORACLE_SHM_NAME bị bỏ qua: hệ điều hành không có fcntl, dùng kho trong RAM của process.")
+SHARED_ORACLE = SharedOracle(ORACLE_SHM_NAME) if ORACLE_SHM_NAME and SHARED_MEMORY_AVAILABLE else None
+
+# AI model (quant_ai_model.pkl): nạp lười 1 lần, chấm điểm cả rổ 1 lượt mỗi khi dữ liệu đổi
+MODEL_SERVICE = ModelService()
+
+# Rổ ngành RRG (các file RRG_*.txt): đọc 1 lần lúc khởi động, dùng chung cho RRG và rổ tải giá của scheduler
+SECTOR_MAP = load_sector_map()
+RRG_TAIL = int(os.environ.get("RRG_TAIL", "10"))  # Số phiên của đuôi (trail) mỗi mã trên biểu đồ RRG
+
+# Tự làm mới Oracle theo lịch (thay cho chạy tay Colab). ORACLE_REFRESH_TIMES rỗng = tắt.
+# Giờ Việt Nam, nhiều mốc cách nhau dấu phẩy; ORACLE_REFRESH_DAYS: thứ trong tuần (0 = thứ 2).
+# ORACLE_SOURCE_FILE: đọc CSV cục bộ thay cho Yahoo (test/offline).
+ORACLE_REFRESH_TIMES = os.environ.get("ORACLE_REFRESH_TIMES", "08:00")
+ORACLE_REFRESH_DAYS = os.environ.get("ORACLE_REFRESH_DAYS", "0-4")
+ORACLE_SOURCE_FILE = os.environ.get("ORACLE_SOURCE_FILE", "")
+ORACLE_SCHEDULER = OracleScheduler(
+    FileSource(ORACLE_SOURCE_FILE) if ORACLE_SOURCE_FILE else ProviderSource(PRICE_PROVIDER, default_universe(SECTOR_MAP)),
+    DailySchedule.parse(ORACLE_REFRESH_TIMES, ORACLE_REFRESH_DAYS),
+) if ORACLE_REFRESH_TIMES else None
+
+if SHARED_ORACLE is not None:
+    @app.middleware("http")
+    async def sync_oracle_version(request: Request, call_next):
+        # Đọc version trong segment điều khiển (vài byte); đổi version -> map bản mới trước khi phục vụ request
+        sync_shared_oracle()
+        return await call_next(request)
+
 @app.get("/")
 def read_root():
     return {"message": "Quant Server Stability V7.1 Active", "status": ORACLE_DATA_STORE["status"]}
@@ -39,45 +139,240 @@ def clean_ticker(ticker):
         ticker += ".VN"
     return ticker
 
+BENCHMARK_KEYS = ["E1VFVN30.VN", "VNINDEX.VN", "^VNINDEX"]
+
+def is_index_ticker(ticker):
+    return "INDEX" in ticker or "E1VFVN30" in ticker
+
+def find_benchmark(store):
+    for k in BENCHMARK_KEYS:
+        if k in store: return k
+    return None
+
+def now_vn():
+    tz_VN = pytz.timezone('Asia/Ho_Chi_Minh')
+    return datetime.now(tz_VN).strftime("%H:%M %d/%m")
+
+async def get_prices(ticker, min_length, period):
+    # 1. RAM: kho Oracle. 2. Cache live / tải từ Yahoo (không chặn event loop)
+    store = ORACLE_DATA_STORE["store"]
+    if store.length(ticker) >= min_length:
+        return store.series(ticker)
+    return await PRICE_FETCHER.fetch(ticker, period)
+
+async def get_prices_many(tickers, min_length, period):
+    # Bản batch của get_prices: mã thiếu trong kho Oracle được tải chung 1 lượt
+    store = ORACLE_DATA_STORE["store"]
+    result = {t: store.series(t) for t in tickers if store.length(t) >= min_length}
+    missing = [t for t in tickers if t not in result]
+    if missing:
+        result.update(await PRICE_FETCHER.fetch_many(missing, period))
+    return result
+
+def universe_columns(store, min_length):
+    # Cột của các mã cổ phiếu (bỏ chỉ số/ETF) có đủ min_length phiên
+    return [j for j, t in enumerate(store.tickers) if not is_index_ticker(t) and store.lengths[j] >= min_length]
+
 # --- 1. NHẬN DỮ LIỆU TỪ COLAB ---
+def install_store(store, meta=None, session=None):
+    # Nạp kho giá mới + dựng lại running state, cache RRG và response JSON. Trả về bodies cho commit_oracle.
+    # meta (snapshot/shared memory/scheduler): last_updated, rrg_cache, refreshed_at, oracle_base có sẵn thì dùng lại
+    # Mọi thứ dựng trên bản nháp trước: lỗi (kể cả encode JSON) -> kho đang phục vụ và response cache giữ nguyên
+    bench = find_benchmark(store)
+    oracle = dict(ORACLE_DATA_STORE)
+    oracle.update({
+        "store": store,
+        "status": "ready",
+        "state": OracleState(store.matrix, None if bench is None else store.index[bench]),
+        "features": FeatureState(store.matrix),
+        "last_updated": (meta or {}).get("last_updated") or now_vn(),
+        "refreshed_at": time.time() if meta is None else meta.get("refreshed_at", 0),
+        "oracle_base": (meta or {}).get("oracle_base"),
+        "last_session": session or (meta or {}).get("last_session") or ((meta or {}).get("oracle_base") or {}).get("as_of"),
+    })
+    rrg_cache = (meta or {}).get("rrg_cache")
+    oracle["rrg_cache"] = calculate_rrg_internal(oracle) if rrg_cache is None else rrg_cache
+    bodies = build_response_cache(oracle)
+    ORACLE_DATA_STORE.update(oracle)
+    return bodies
+
+def oracle_meta():
+    return {key: ORACLE_DATA_STORE[key] for key in ("last_updated", "rrg_cache", "refreshed_at", "oracle_base", "last_session")}
+
+def commit_oracle(bodies, persist=True, persist_delay=0.0):
+    # Sau mỗi lần kho đổi (upload/append/restore): phát hành cho các worker khác -> thay response cache -> hẹn ghi snapshot
+    version = None
+    if SHARED_ORACLE is not None:
+        try:
+            version, store = SHARED_ORACLE.publish(ORACLE_DATA_STORE["store"], oracle_meta())
+            ORACLE_DATA_STORE["store"] = store  # Dùng luôn bản trên shared memory, bỏ bản riêng của worker
+        except Exception as e:
+            print(f"Shared publish fail: {e}")
+    RESPONSE_CACHE.install(bodies, ORACLE_DATA_STORE["last_updated"], version)
+    if persist: persist_oracle(persist_delay)
+
+def sync_shared_oracle():
+    # Worker khác vừa phát hành version mới -> map lại (zero-copy), chỉ dựng running state cục bộ
+    update = SHARED_ORACLE.poll()
+    if update is None: return False
+    version, store, meta = update
+    RESPONSE_CACHE.install(install_store(store, meta), ORACLE_DATA_STORE["last_updated"], version)
+    return True
+
+def persist_oracle(delay=0.0):
+    if SNAPSHOT_WRITER is None: return
+    try:
+        SNAPSHOT_WRITER.submit(ORACLE_DATA_STORE["store"], oracle_meta(), delay)
+    except Exception as e:
+        print(f"Persist fail: {e}")
+
+def restore_oracle():
+    # Khởi động: worker khác đã phát hành trên shared memory -> dùng luôn bản đó
+    if SHARED_ORACLE is not None and sync_shared_oracle():
+        print(f"Attached shared oracle v{SHARED_ORACLE.version}: {len(ORACLE_DATA_STORE['store'])} tickers")
+        return
+    # Không thì map lại snapshot (chỉ đọc, không nạp cả ma trận vào RAM) -> "ready" ngay
+    if not ORACLE_CACHE_DIR: return
+    try:
+        snapshot = load_snapshot(ORACLE_CACHE_DIR)
+        if snapshot is None: return
+        store, meta = snapshot
+        commit_oracle(install_store(store, meta), persist=False)
+        print(f"Restored oracle snapshot: {len(store)} tickers ({meta.get('last_updated')})")
+    except Exception as e:
+        print(f"Restore fail: {e}")
+
 @app.post("/api/upload-oracle")
 async def upload_oracle(request: Request):
     try:
+        content_type = request.headers.get("content-type", "")
+        # Ngày phiên cuối của dữ liệu (?session=YYYY-MM-DD hoặc key "session" của JSON) cho append-oracle
+        session = request.query_params.get("session")
+        if content_type.startswith(matrix_codec.CONTENT_TYPE):
+            # Nhị phân QMX1: ma trận float64 dùng trực tiếp trên buffer của request (zero-copy)
+            tickers, matrix, lengths = matrix_codec.decode_matrix(await request.body())
+            store = PriceStore(matrix, tickers, lengths)
+        elif "ndjson" in content_type:
+            # Streaming: parse từng dòng, ghi thẳng vào kho giá -> RAM đỉnh không phụ thuộc kích thước payload
+            ingestor = NDJSONIngestor()
+            async for chunk in request.stream():
+                ingestor.feed(chunk)
+            store = ingestor.close()
+        else:
+            payload = await request.json()
+            session = payload.pop("session", None) or session
+            if "data" in payload: clean_data = payload["data"]
+            elif isinstance(payload.get("recent_prices_json"), str):
+                clean_data = json.loads(payload["recent_prices_json"])  # Payload JSON của Colab: giá nằm trong DataFrame.to_json
+            else: clean_data = payload
+            store = PriceStore.from_dict(clean_data)
+            del payload, clean_data
+
+        commit_oracle(install_store(store, session=session))
+        return {"status": "success", "count": len(store)}
+    except Exception as e:
+        return {"status": "error", "detail": str(e)}
+
+# --- 1B. NHẬN PHIÊN MỚI (DELTA) - KHÔNG TÍNH LẠI TỪ ĐẦU ---
+# Payload: {"session": "YYYY-MM-DD" (ngày của phiên cuối trong delta), "data": {ticker: [giá cũ -> mới]}}
+# - session trùng phiên cuối trong kho: giá trong phiên gửi lại (VD: mỗi 5 phút) -> ghi đè phiên cuối, không nối thêm
+#   (chỉ nhận delta 1 phiên; delta nhiều phiên lặp lại phiên cuối bị từ chối, kho không đổi)
+# - session mới (hoặc không gửi session, tương thích cũ): nối thêm k phiên
+@app.post("/api/append-oracle")
+async def append_oracle(request: Request):
+    try:
+        if ORACLE_DATA_STORE["status"] != "ready":
+            return {"status": "error", "detail": "Chưa có dữ liệu nền, hãy gọi /api/upload-oracle trước."}
+
         payload = await request.json()
-        if "data" in payload: clean_data = payload["data"]
-        else: clean_data = payload
+        session = payload.pop("session", None)
+        if "data" in payload: delta = payload["data"]
+        else: delta = payload
 
-        ORACLE_DATA_STORE["data"] = clean_data
-        ORACLE_DATA_STORE["status"] = "ready"
-        
-        tz_VN = pytz.timezone('Asia/Ho_Chi_Minh')
-        ORACLE_DATA_STORE["last_updated"] = datetime.now(tz_VN).strftime("%H:%M %d/%m")
-        
-        calculate_rrg_internal(clean_data)
-        return {"status": "success", "count": len(clean_data)}
+        last_session = ORACLE_DATA_STORE["last_session"]
+        if session is not None and last_session is not None and str(session) < last_session:
+            return {"status": "error", "detail": f"Phiên {session} cũ hơn phiên cuối trong kho ({last_session})."}
+
+        store = ORACLE_DATA_STORE["store"]
+        state = ORACLE_DATA_STORE["state"]
+        unknown = [t for t in delta if t not in store]
+        known = {t: v for t, v in delta.items() if t in store and isinstance(v, list) and v}
+        if not known:
+            return {"status": "error", "detail": "Không có mã hợp lệ trong delta.", "unknown": unknown}
+
+        # Ghép delta thành k hàng (k, N) căn lề phải; mã không gửi phiên mới sẽ được ffill
+        k = max(len(v) for v in known.values())
+        rows = np.full((k, len(store)), np.nan)
+        for t, v in known.items():
+            rows[k - len(v):, store.index[t]] = v
+
+        replaced = session is not None and str(session) == last_session
+        if replaced and k > 1:
+            # session là ngày của hàng CUỐI: k-1 hàng trước thuộc các phiên đã có trong kho -> không đoán, từ chối
+            print(f"append-oracle: từ chối delta {k} phiên lặp lại phiên cuối {session}")
+            return {"status": "error", "detail": f"Delta {k} phiên có session {session} trùng phiên cuối trong kho: "
+                                                 "chỉ được gửi lại 1 phiên (giá mới nhất) cho phiên đang diễn ra."}
+        if replaced:
+            # Cùng phiên: chỉ giá mới nhất của mỗi mã, thay đóng góp cũ của phiên cuối trong running state
+            store.replace_last(rows[-1])
+            state.replace_last(store.matrix[-1])
+            ORACLE_DATA_STORE["features"].replace_last(store.matrix[-1])
+        else:
+            store.append(rows)
+            for row in store.matrix[-k:]:
+                state.push(row)
+                ORACLE_DATA_STORE["features"].push(row)
+            if session is not None: ORACLE_DATA_STORE["last_session"] = str(session)
+
+        ORACLE_DATA_STORE["last_updated"] = now_vn()
+        ORACLE_DATA_STORE["refreshed_at"] = time.time()
+
+        ORACLE_DATA_STORE["rrg_cache"] = calculate_rrg_internal(ORACLE_DATA_STORE)
+        commit_oracle(build_response_cache(ORACLE_DATA_STORE), persist_delay=ORACLE_PERSIST_DELAY)
+        return {"status": "success", "appended": 0 if replaced else k, "replaced": int(replaced),
+                "session": ORACLE_DATA_STORE["last_session"], "count": len(known), "unknown": unknown}
     except Exception as e:
         return {"status": "error", "detail": str(e)}
 
 # --- 2. CÁC API PHỤC VỤ WEB ---
+def build_response_cache(oracle):
+    # Tính + encode 1 lần cho mỗi phiên bản dữ liệu (breadth/signals ghi vào oracle); các lần poll sau chỉ trả bytes có sẵn
+    oracle["breadth"] = calculate_breadth(oracle)
+    oracle["signals"] = calculate_signals(oracle)
+    return RESPONSE_CACHE.encode({
+        "pulse": calculate_pulse(oracle),
+        "rrg": oracle["rrg_cache"],
+        "breadth": oracle["breadth"],
+    })
 
-# A. MARKET PULSE (Đa dạng key, chống cache)
+def cached_response(request, key, compute):
+    # no-cache (không phải no-store): trình duyệt vẫn lưu và gửi If-None-Match để nhận 304
+    body, etag = RESPONSE_CACHE.lookup(key)  # 1 lần đọc -> body và ETag luôn cùng phiên bản
+    if body is None:
+        return JSONResponse(compute(), headers={"Cache-Control": "no-cache, no-store, must-revalidate"})
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if RESPONSE_CACHE.matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+# A. MARKET PULSE (Đa dạng key, ETag + 304)
 @app.api_route("/api/dashboard/sentiment", methods=["GET", "POST"])
-def get_sentiment(response: Response): 
-    response.headers["Cache-Control"] = "no-cache, no-store, must-revalidate"
-    return calculate_pulse()
+def get_sentiment(request: Request): 
+    return cached_response(request, "pulse", calculate_pulse)
 
 @app.api_route("/api/market-pulse", methods=["GET", "POST"])
-def get_pulse(response: Response): 
-    response.headers["Cache-Control"] = "no-cache, no-store, must-revalidate"
-    return calculate_pulse()
+def get_pulse(request: Request): 
+    return cached_response(request, "pulse", calculate_pulse)
 
 # B. RRG CHART
 @app.api_route("/api/dashboard/rrg", methods=["GET", "POST"])
-def get_rrg(response: Response):
-    response.headers["Cache-Control"] = "no-cache, no-store, must-revalidate"
-    if ORACLE_DATA_STORE["rrg_cache"]:
-        return ORACLE_DATA_STORE["rrg_cache"]
-    return []
+def get_rrg(request: Request):
+    return cached_response(request, "rrg", lambda: ORACLE_DATA_STORE["rrg_cache"] or [])
+
+# B2. ĐỘ RỘNG THỊ TRƯỜNG (% trên MA20/50/200, tăng/giảm, đỉnh/đáy mới, RS > 100)
+@app.api_route("/api/dashboard/breadth", methods=["GET", "POST"])
+def get_breadth(request: Request):
+    return cached_response(request, "breadth", lambda: ORACLE_DATA_STORE["breadth"])
 
 # C. FUNDAMENTAL SNAPSHOT (Fix Crash)
 @app.api_route("/api/dashboard/fundamentals", methods=["GET", "POST"])
@@ -90,38 +385,35 @@ async def get_fundamentals(request: Request):
             ticker = request.query_params.get("ticker", "HPG")
 
         ticker = clean_ticker(ticker)
-        data = ORACLE_DATA_STORE["data"]
         
-        if ticker in data and len(data[ticker]) >= 2:
-            prices = data[ticker]
-        else:
-            # Fallback Fetch
-            try:
-                # Fetch minimal history for change calc
-                df = yf.download(ticker, period="5d", interval="1d", progress=False, auto_adjust=True)
-                if not df.empty:
-                    try: p = df.xs(ticker, level=1, axis=1)['Close']
-                    except: p = df['Close']
-                    prices = p.dropna().tolist()
-            except: pass
-
-        if len(prices) < 2:
-            return {"ticker": ticker, "current_price": 0, "change": 0}
-        curr = prices[-1]
-        prev = prices[-2]
-        change = curr - prev
-        pct = (change / prev) * 100
+        prices = []
+        try:
+            # Fallback Fetch: chỉ cần lịch sử tối thiểu để tính thay đổi
+            prices = await get_prices(ticker, 2, "5d")
+        except: pass
 
-        return {
-            "ticker": ticker,
-            "current_price": curr,
-            "change": round(change, 2),
-            "pct_change": round(pct, 2),
-            "pe": "Updating...", "roe": "Updating...", "signal": "Neutral"
-        }
+        return fundamentals_payload(ticker, prices)
     except Exception as e:
         return {"status": "error", "detail": str(e)}
 
+def fundamentals_payload(ticker, prices):
+    # Upload có thể chứa null -> NaN trong kho: coi như không đủ dữ liệu (NaN không encode được JSON)
+    if len(prices) < 2 or not np.isfinite(prices[-2:]).all() or float(prices[-2]) == 0:
+        return {"ticker": ticker, "current_price": 0, "change": 0}
+    curr = float(prices[-1])
+    prev = float(prices[-2])
+    change = curr - prev
+    pct = (change / prev) * 100
+
+    return {
+        "ticker": ticker,
+        "current_price": curr,
+        "change": round(change, 2),
+        "pct_change": round(pct, 2),
+        "pe": "Updating...", "roe": "Updating...",
+        "signal": signal_label(ORACLE_DATA_STORE["signals"].get(ticker, 0.5)),
+    }
+
 # D. CHART API (Fix Crash + On-the-fly Fetch)
 @app.api_route("/api/dashboard/chart", methods=["GET", "POST"])
 async def get_chart(request: Request):
@@ -133,36 +425,78 @@ async def get_chart(request: Request):
             ticker = request.query_params.get("ticker", "HPG")
             
         ticker = clean_ticker(ticker)
-        data = ORACLE_DATA_STORE["data"]
         
         recent_prices = []
         
-        # 1. Try RAM
-        if ticker in data and len(data[ticker]) >= 30:
-            recent_prices = data[ticker][-30:]
-        else:
-            # 2. Fallback: Fetch Live from Yahoo
-            try:
-                print(f"Fetching live for {ticker}...")
-                df = yf.download(ticker, period="3mo", interval="1d", progress=False, auto_adjust=True)
-                if not df.empty:
-                    try: prices = df.xs(ticker, level=1, axis=1)['Close']
-                    except: prices = df['Close']
-                    
-                    recent_prices = prices.dropna().tolist()[-30:]
-            except Exception as e:
-                print(f"Live fetch fail: {e}")
-
-        if recent_prices:
-            return {
-                "ticker": ticker,
-                "prices": recent_prices,
-                "labels": [f"T{i}" for i in range(len(recent_prices))]
-            }
-            
-        return {"prices": [], "labels": []}
+        # RAM trước, thiếu thì tải live từ Yahoo
+        try:
+            recent_prices = await get_prices(ticker, 30, "3mo")
+        except Exception as e:
+            print(f"Live fetch fail: {e}")
+
+        return chart_payload(ticker, recent_prices)
     except: return {"prices": [], "labels": []}
 
+def chart_payload(ticker, prices):
+    # NaN (null trong upload) -> None: JSON hợp lệ, Plotly vẽ thành khoảng trống
+    recent_prices = [p if np.isfinite(p) else None for p in prices[-30:].tolist()] if len(prices) else []
+    if recent_prices:
+        return {
+            "ticker": ticker,
+            "prices": recent_prices,
+            "labels": [f"T{i}" for i in range(len(recent_prices))]
+        }
+    return {"prices": [], "labels": []}
+
+# D1. CHART OHLCV + VOLUME PROFILE (POC), rút gọn phía Server theo ngân sách điểm
+@app.api_route("/api/dashboard/ohlcv", methods=["GET", "POST"])
+async def get_ohlcv_chart(request: Request):
+    try:
+        params = dict(request.query_params)
+        if request.method == "POST":
+            params.update(await request.json())
+        ticker = clean_ticker(params.get("ticker", "HPG"))
+        period = str(params.get("range", "1y")).lower()
+        if period not in CHART_RANGES:
+            return {"status": "error", "detail": f"range phải thuộc {sorted(CHART_RANGES)}"}
+        bins = min(max(int(params.get("bins", DEFAULT_BINS)), MIN_BINS), MAX_BINS)
+        points = min(max(int(params.get("points", DEFAULT_POINTS)), MIN_POINTS), MAX_POINTS)
+
+        body = await CHART_SERVICE.get(ticker, period, bins, points)
+        return Response(content=body, media_type="application/json", headers={"Cache-Control": "max-age=60"})
+    except Exception as e:
+        return {"status": "error", "detail": str(e)}
+
+# D2. BATCH (Watchlist: hit lấy từ RAM, mã thiếu gom vào 1 lượt yf.download)
+MAX_BATCH_TICKERS = 50
+
+async def read_batch_tickers(request):
+    if request.method == "POST":
+        body = await request.json()
+        tickers = body.get("tickers", [])
+    else:
+        tickers = request.query_params.get("tickers", "").split(",")
+    tickers = [clean_ticker(t) for t in tickers if isinstance(t, str) and t.strip()]
+    return list(dict.fromkeys(tickers))[:MAX_BATCH_TICKERS]
+
+@app.api_route("/api/dashboard/chart/batch", methods=["GET", "POST"])
+async def get_chart_batch(request: Request):
+    try:
+        tickers = await read_batch_tickers(request)
+        prices_map = await get_prices_many(tickers, 30, "3mo")
+        return {"data": {t: chart_payload(t, prices_map.get(t, [])) for t in tickers}}
+    except Exception as e:
+        return {"status": "error", "detail": str(e)}
+
+@app.api_route("/api/dashboard/fundamentals/batch", methods=["GET", "POST"])
+async def get_fundamentals_batch(request: Request):
+    try:
+        tickers = await read_batch_tickers(request)
+        prices_map = await get_prices_many(tickers, 2, "5d")
+        return {"data": {t: fundamentals_payload(t, prices_map.get(t, [])) for t in tickers}}
+    except Exception as e:
+        return {"status": "error", "detail": str(e)}
+
 # E. AI ORACLE (Fix Crash)
 @app.api_route("/api/ask-ai", methods=["GET", "POST"])
 async def ask_ai(request: Request):
@@ -174,49 +508,83 @@ async def ask_ai(request: Request):
             ticker = request.query_params.get("ticker", "")
 
         ticker = clean_ticker(ticker)
-        data = ORACLE_DATA_STORE["data"]
+        store = ORACLE_DATA_STORE["store"]
 
-        if ticker not in data or len(data[ticker]) < 20:
+        if store.length(ticker) < 20:
             return {"answer": f"Tôi chưa có đủ dữ liệu về mã {ticker} để tư vấn."}
 
-        prices = data[ticker]
-        last_price = prices[-1]
-        ma20 = sum(prices[-20:]) / 20
+        j = store.index[ticker]
+        last_price = float(store.matrix[-1, j])
+        ma20 = float(ORACLE_DATA_STORE["state"].ma20.mean([j])[0])
+        if not (np.isfinite(last_price) and np.isfinite(ma20)):
+            return {"answer": f"Tôi chưa có đủ dữ liệu về mã {ticker} để tư vấn."}
         trend = "TĂNG 📈" if last_price > ma20 else "GIẢM 📉"
-        
-        return {
-            "answer": f"🤖 Phân tích {ticker}:\n- Giá hiện tại: {last_price:,.0f}\n- Xu hướng ngắn hạn: {trend}\n- Vị thế: Đang {'nằm trên' if last_price > ma20 else 'nằm dưới'} đường trung bình 20 phiên."
-        }
+        answer = f"🤖 Phân tích {ticker}:\n- Giá hiện tại: {last_price:,.0f}\n- Xu hướng ngắn hạn: {trend}\n- Vị thế: Đang {'nằm trên' if last_price > ma20 else 'nằm dưới'} đường trung bình 20 phiên."
+
+        # Feature tính sẵn cho phiên mới nhất -> chỉ đọc 1 hàng
+        features = ORACLE_DATA_STORE["features"].row(j)
+        if features is None:
+            return {"answer": answer}
+        answer += f"\n- RSI(14): {features['RSI']:.1f} | MACD Hist: {features['MACD_Hist']:,.1f} | %B: {features['BB_PctB']:.2f} | BandWidth: {features['BandWidth']:.3f}"
+        result = {"answer": answer, "ticker": ticker, "features": {k: round(v, 4) for k, v in features.items()},
+                  "details": {"RSI": round(features["RSI"], 1), "MACD": round(features["MACD_Hist"], 2),
+                              "Vol_Rat": round(features["Vol_Ratio"], 2), "BB_Pct": round(features["BB_PctB"], 2),
+                              "BandWidth": round(features["BandWidth"], 3)}}
+
+        # Xác suất đã chấm sẵn cho phiên bản dữ liệu hiện tại (không chạy model mỗi request)
+        proba = ORACLE_DATA_STORE["signals"].get(ticker)
+        if proba is not None:
+            result["signal"] = "TĂNG 📈" if proba >= 0.5 else "GIẢM 📉"
+            result["confidence"] = round(max(proba, 1 - proba) * 100, 1)
+            result["probability"] = round(proba, 4)
+            result["answer"] += f"\n- AI Model: {result['signal']} (độ tin cậy {result['confidence']}%)"
+        return result
     except:
         return {"answer": "Lỗi xử lý AI."}
 
+# F. CACHE STATS (Theo dõi hit/miss/eviction của cache live)
+@app.get("/api/cache-stats")
+def get_cache_stats():
+    return {
+        "live_prices": PRICE_FETCHER.cache.stats(),
+        "charts": CHART_SERVICE.cache.stats(),
+        "oracle_store_bytes": ORACLE_DATA_STORE["store"].nbytes,
+        "shared_version": None if SHARED_ORACLE is None else SHARED_ORACLE.version,
+        "ai_model": MODEL_SERVICE.status(),
+    }
+
 # --- INTERNAL LOGIC ---
-def calculate_pulse():
-    if ORACLE_DATA_STORE["status"] != "ready":
+def calculate_pulse(oracle=ORACLE_DATA_STORE):
+    if oracle["status"] != "ready":
         return {"score": 0, "status": "WARMUP ⏳", "timestamp": "Loading..."}
 
     try:
-        data = ORACLE_DATA_STORE["data"]
-        uptrend = 0
-        total = 0
-        for t, p in data.items():
-            if "INDEX" in t or "E1VFVN30" in t or len(p) < 20: continue
-            if p[-1] > (sum(p[-20:])/20): uptrend += 1
-            total += 1
+        store = oracle["store"]
+        oracle_state = oracle["state"]
+        # So sánh giá cuối với MA20 lấy từ running state -> O(N), không quét lại cửa sổ
+        cols = universe_columns(store, 20)
+        total = len(cols)
+        if total > 0:
+            uptrend = int(np.count_nonzero(store.matrix[-1, cols] > oracle_state.ma20.mean(cols)))
         
         score = uptrend / total if total > 0 else 0.5
         state = "GREED 🐂" if score >= 0.55 else ("FEAR 🐻" if score <= 0.45 else "NEUTRAL 😐")
         
         vn_price = 0
         vn_change = 0
-        for k in ["E1VFVN30.VN", "VNINDEX.VN", "^VNINDEX"]:
-            if k in data and len(data[k]) > 1:
-                vn_price = data[k][-1]
-                vn_change = vn_price - data[k][-2]
+        for k in BENCHMARK_KEYS:
+            if store.length(k) > 1:
+                last_two = store.tail(k, 2)
+                if not np.isfinite(last_two).all(): continue  # null trong upload -> NaN không encode được JSON
+                vn_price = float(last_two[-1])
+                vn_change = vn_price - float(last_two[-2])
                 break
 
-        time_str = ORACLE_DATA_STORE["last_updated"]
-        
+        time_str = oracle["last_updated"]
+        breadth = dict(oracle["breadth"])
+        if oracle["oracle_base"]:
+            breadth["rs_above_100_t1"] = oracle["oracle_base"].get("breadth_t1")
+
         return {
             "score": round(score, 2), "sentiment_score": round(score, 2),
             "status": state, "market_status": state,
@@ -225,34 +593,91 @@ def calculate_pulse():
             "timestamp": time_str,
             "last_updated": time_str,  # Dự phòng
             "updatedAt": time_str,     # Dự phòng
-            "date": time_str           # Dự phòng
+            "date": time_str,          # Dự phòng
+            "breadth": breadth,
         }
     except: return {"score": 0, "status": "ERROR"}
 
-def calculate_rrg_internal(data):
+def calculate_breadth(oracle=ORACLE_DATA_STORE):
+    # Mọi chỉ số độ rộng trong 1 lượt ma trận; gọi 1 lần mỗi phiên bản dữ liệu (build_response_cache)
+    if oracle["status"] != "ready": return {}
+    try:
+        store, state = oracle["store"], oracle["state"]
+        return compute_breadth(store.matrix, universe_columns(store, 20), state.bench_col)
+    except: return {}
+
+def calculate_signals(oracle=ORACLE_DATA_STORE):
+    # 1 lượt predict_proba cho cả rổ trên feature phiên mới nhất; request chỉ tra dict
+    if oracle["status"] != "ready": return {}
+    try:
+        store = oracle["store"]
+        cols = universe_columns(store, 20)
+        return MODEL_SERVICE.predict(oracle["features"].values[cols], [store.tickers[j] for j in cols])
+    except Exception as e:
+        print(f"AI scoring fail: {e}")
+        return {}
+
+def calculate_rrg_internal(oracle):
     try:
         rrg_list = []
-        bench_prices = None
-        for k in ["E1VFVN30.VN", "VNINDEX.VN", "^VNINDEX"]:
-            if k in data: 
-                bench_prices = pd.Series(data[k])
-                break
-        if bench_prices is None: return
-
-        for ticker, prices in data.items():
-            if "INDEX" in ticker or "E1VFVN30" in ticker or len(prices) < 20: continue
-            p = pd.Series(prices)
-            rs = 100 * (p / bench_prices)
-            rs_ratio = (rs / rs.rolling(10).mean()) * 100
-            rs_mom = (rs_ratio / rs_ratio.shift(1)) * 100
-            if not np.isnan(rs_ratio.iloc[-1]):
+        store, state = oracle["store"], oracle["state"]
+        if state is None or state.bench_col is None: return []
+
+        # RS_Ratio/RS_Momentum phiên cuối của cả rổ đã có sẵn trong running state;
+        # đuôi RRG_TAIL phiên của mọi mã (mọi rổ ngành) tính chung 1 lượt ma trận trên các hàng cuối
+        cols = universe_columns(store, 20)
+        last_ratio, last_mom = state.rs_ratio[cols], state.rs_momentum[cols]
+        rows = store.matrix[-(RRG_TAIL + RRG_WINDOW):]
+        tail_ratio, tail_mom = compute_rrg(rows[:, cols], rows[:, state.bench_col], tail=RRG_TAIL)
+        tail_ratio, tail_mom = np.round(tail_ratio, 2), np.round(tail_mom, 2)
+        groups = group_memberships([store.tickers[j] for j in cols], SECTOR_MAP)
+
+        for k, j in enumerate(cols):
+            # Bỏ mã có RS_Ratio/RS_Momentum không hữu hạn (VD: 1 giá null trong 11 phiên cuối)
+            if np.isfinite(last_ratio[k]) and np.isfinite(last_mom[k]):
+                member_of = groups.get(k, ["Khac"])
                 rrg_list.append({
-                    "Ticker": ticker.replace(".VN", ""), "Group": "VN30",
-                    "RS_Ratio": round(rs_ratio.iloc[-1], 2), "RS_Momentum": round(rs_mom.iloc[-1], 2)
+                    "Ticker": store.tickers[j].replace(".VN", ""), "Group": member_of[0], "Groups": member_of,
+                    "RS_Ratio": round(last_ratio[k], 2), "RS_Momentum": round(last_mom[k], 2),
+                    # [[RS_Ratio, RS_Momentum]] cũ -> mới, bỏ phiên chưa đủ dữ liệu
+                    "Tail": [[float(x), float(y)] for x, y in zip(tail_ratio[:, k], tail_mom[:, k])
+                             if np.isfinite(x) and np.isfinite(y)],
                 })
-        ORACLE_DATA_STORE["rrg_cache"] = rrg_list
-    except: pass
+        return rrg_list
+    except: return []
+
+# --- LÀM MỚI ORACLE THEO LỊCH ---
+def start_oracle_scheduler(loop):
+    if ORACLE_SCHEDULER is None: return
+
+    def on_refresh(prices, oracle_base):
+        # Tải + trích xuất đã xong trong thread scheduler; nạp kho trên event loop (cùng thread với upload/append)
+        store = PriceStore(np.ascontiguousarray(prices.to_numpy(dtype=np.float64)), [str(c) for c in prices.columns])
+        async def apply():
+            commit_oracle(install_store(store, {"oracle_base": oracle_base, "refreshed_at": time.time()}))
+        asyncio.run_coroutine_threadsafe(apply(), loop).result()  # Lỗi khi nạp -> scheduler ghi nhận và thử lại
+
+    ORACLE_SCHEDULER.start(on_refresh, lambda: ORACLE_DATA_STORE["refreshed_at"])
+
+@app.get("/api/oracle-status")
+def get_oracle_status():
+    return {
+        "status": ORACLE_DATA_STORE["status"],
+        "last_updated": ORACLE_DATA_STORE["last_updated"],
+        "refreshed_at": ORACLE_DATA_STORE["refreshed_at"],
+        "as_of": (ORACLE_DATA_STORE["oracle_base"] or {}).get("as_of"),
+        "scheduler": None if ORACLE_SCHEDULER is None else ORACLE_SCHEDULER.status(),
+        "snapshot": None if SNAPSHOT_WRITER is None else SNAPSHOT_WRITER.status(),
+    }
+
+restore_oracle()
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # UVICORN_WORKERS > 1: nhiều process phục vụ song song, dùng chung dữ liệu qua shared memory
+    workers = int(os.environ.get("UVICORN_WORKERS", "1"))
+    if workers > 1:
+        os.environ.setdefault("ORACLE_SHM_NAME", "quant_oracle")
+        uvicorn.run("main:app", host="0.0.0.0", port=8000, workers=workers)
+    else:
+        uvicorn.run(app, host="0.0.0.0", port=8000)
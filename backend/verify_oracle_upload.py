@@ -0,0 +1,76 @@
+import json
+import os
+import sys
+import warnings
+
+import numpy as np
+import pandas as pd
+
+# Kiểm tra đường upload JSON dự phòng của colab_oracle_pusher.txt (USE_BINARY_UPLOAD = False):
+# dựng payload ĐÚNG hình dạng Colab gửi (map phụ + recent_prices_json + session) trên dữ liệu giả,
+# POST vào /api/upload-oracle và xác nhận kho chỉ chứa các mã thật, không có key phụ nào thành "mã".
+# Chạy: cd backend && python verify_oracle_upload.py
+warnings.filterwarnings('ignore')
+os.environ.setdefault("ORACLE_CACHE_DIR", "")       # Không ghi snapshot của lần kiểm tra
+os.environ.setdefault("ORACLE_REFRESH_TIMES", "")   # Không chạy scheduler
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fastapi.testclient import TestClient
+import main
+from core_engine.price_store import COLAB_META_KEYS
+
+TICKERS = ["ACB.VN", "FPT.VN", "HPG.VN", "VCB.VN", "VNM.VN", "^VNINDEX"]
+
+def build_colab_json_payload(n_days=260, seed=7):
+    # Giống run_oracle_extraction(): index chuỗi 'YYYY-MM-DD', ffill, các map phụ rồi tail(40) -> to_json
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range(end="2025-12-30", periods=n_days)
+    data = pd.DataFrame(100 * np.exp(rng.normal(0, 0.01, (n_days, len(TICKERS))).cumsum(axis=0)),
+                        index=index, columns=TICKERS)
+    data.iloc[:30, 0] = np.nan  # 1 mã niêm yết muộn -> null ở đầu chuỗi
+    data.index = data.index.strftime('%Y-%m-%d')
+    data = data.ffill()
+
+    ma200 = data.rolling(200).mean().iloc[-1].dropna().to_dict()
+    price_t20 = data.iloc[-21].dropna().to_dict()
+    mom_history = [float(x) for x in np.random.default_rng(seed).normal(0, 1, 20)]
+    return {
+        "ma200_map": ma200,
+        "price_t20_map": price_t20,
+        "mom_history_array": mom_history,
+        "breadth_t1": 0.5,
+        "recent_prices_json": data.tail(40).to_json(date_format='iso'),
+        "session": data.index[-1],
+    }, data.tail(40)
+
+def verify():
+    payload, recent = build_colab_json_payload()
+    client = TestClient(main.app)
+    response = client.post("/api/upload-oracle", data=json.dumps(payload), headers={"Content-Type": "application/json"})
+    print("Upload:", response.json())
+
+    store = main.ORACLE_DATA_STORE["store"]
+    leaked = sorted(set(store.tickers) & COLAB_META_KEYS)
+    ok = True
+    if leaked:
+        print(f"❌ Key phụ bị nạp thành mã: {leaked}"); ok = False
+    if sorted(store.tickers) != sorted(TICKERS):
+        print(f"❌ Danh sách mã lệch: {store.tickers}"); ok = False
+    for t in TICKERS:
+        expected = recent[t].dropna().to_numpy()
+        if not np.allclose(store.series(t), expected):
+            print(f"❌ Chuỗi giá {t} lệch"); ok = False
+    if main.ORACLE_DATA_STORE["last_session"] != payload["session"]:
+        print(f"❌ Phiên cuối: {main.ORACLE_DATA_STORE['last_session']}"); ok = False
+
+    rrg = client.get("/api/dashboard/rrg").json()
+    rrg_leaked = [r["Ticker"] for r in rrg if r["Ticker"] + ".VN" not in TICKERS]
+    if rrg_leaked:
+        print(f"❌ RRG có mã lạ: {rrg_leaked}"); ok = False
+    print(f"Kho: {len(store)} mã x {store.n_rows} phiên | RRG: {len(rrg)} mã | "
+          f"Pulse: {client.get('/api/market-pulse').json().get('status')}")
+    print("✅ PASS" if ok else "❌ FAIL")
+    return ok
+
+if __name__ == "__main__":
+    sys.exit(0 if verify() else 1)
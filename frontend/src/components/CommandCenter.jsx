@@ -120,39 +120,53 @@ const CommandCenter = () => {
         setChartError(null);
         try {
             console.log("Sending Axios request...");
-            const res = await axios.post(`${API_URL}/api/dashboard/chart`, { ticker });
+            const res = await axios.post(`${API_URL}/api/dashboard/ohlcv`, { ticker, range: '1y', bins: 50, points: 500 });
 
-            // Backend returns: { ticker: "HPG", prices: [10, 11...], labels: ["T1", "T2"...] }
-            if (res.data.prices && res.data.prices.length > 0) {
-                const prices = res.data.prices;
-                const labels = res.data.labels;
+            // Backend returns OHLCV (đã gộp nến nếu quá ngân sách điểm) + volume profile + POC
+            if (res.data.dates && res.data.dates.length > 0) {
+                const d = res.data;
 
-                // Construct Plotly Data Object
+                // Construct Plotly Data Object: nến (trục trái) + volume profile nằm ngang (trục x phụ phía trên)
                 const plotData = [
                     {
-                        x: labels,
-                        y: prices,
-                        type: 'scatter',
-                        mode: 'lines+markers',
-                        marker: { color: '#00e5ff' },
-                        line: { width: 2 },
-                        name: 'Close Price'
+                        x: d.dates,
+                        open: d.open, high: d.high, low: d.low, close: d.close,
+                        type: 'candlestick',
+                        increasing: { line: { color: '#00e676' } },
+                        decreasing: { line: { color: '#ff1744' } },
+                        name: d.bucket > 1 ? `${d.ticker} (${d.bucket} phiên/nến)` : d.ticker
+                    },
+                    {
+                        x: d.profile.volume,
+                        y: d.profile.price,
+                        type: 'bar',
+                        orientation: 'h',
+                        xaxis: 'x2',
+                        marker: { color: 'rgba(0,229,255,0.25)' },
+                        hoverinfo: 'x+y',
+                        name: 'Volume Profile'
                     }
                 ];
 
                 const plotLayout = {
-                    title: `Technical Chart: ${ticker}`,
+                    title: `Technical Chart: ${ticker} - POC ${d.poc.toLocaleString()}`,
                     paper_bgcolor: 'rgba(0,0,0,0)',
                     plot_bgcolor: 'rgba(0,0,0,0)',
                     font: { color: '#ddd' },
-                    xaxis: { showgrid: false, color: '#888' },
-                    yaxis: { showgrid: true, gridcolor: '#333' }
+                    showlegend: false,
+                    xaxis: { showgrid: false, color: '#888', rangeslider: { visible: false } },
+                    xaxis2: { overlaying: 'x', side: 'top', showticklabels: false, showgrid: false, range: [0, Math.max(...d.profile.volume) * 4] },
+                    yaxis: { showgrid: true, gridcolor: '#333' },
+                    shapes: [{
+                        type: 'line', xref: 'paper', x0: 0, x1: 1, y0: d.poc, y1: d.poc,
+                        line: { color: '#ffea00', width: 1, dash: 'dash' }
+                    }]
                 };
 
                 setChartData({ data: plotData, layout: plotLayout });
 
             } else {
-                const msg = res.data.error || "Không có dữ liệu trả về";
+                const msg = res.data.error || res.data.detail || "Không có dữ liệu trả về";
                 console.error("Chart error:", msg);
                 setChartData(null);
                 setChartError(msg);
@@ -196,7 +210,7 @@ const CommandCenter = () => {
     // --- LOOP 2: RRG CHART (HEAVY) ---
     const fetchRRG = async () => {
         try {
-            const res = await axios.post(`${API_URL}/api/dashboard/rrg`);
+            const res = await axios.get(`${API_URL}/api/dashboard/rrg`);
             const rrgList = res.data.data || []; // Note: Backend returns direct list if cached, but let's be safe
 
             // Backend actually returns list directly if cached, or empty list.
@@ -209,11 +223,13 @@ const CommandCenter = () => {
                     x: item.RS_Ratio || item.rs_ratio,
                     y: item.RS_Momentum || item.rs_momentum,
                     group: item.Group || item.group || "VN30",
+                    groups: item.Groups || [item.Group || item.group || "VN30"], // Mã có thể thuộc nhiều rổ
+                    tail: item.Tail || [], // [[RS_Ratio, RS_Momentum]] các phiên gần nhất (cũ -> mới)
                     size: 10
                 }));
 
                 setRrgData(mappedRrg);
-                setGroups(['ALL', ...Array.from(new Set(mappedRrg.map(d => d.group))).sort()]);
+                setGroups(['ALL', ...Array.from(new Set(mappedRrg.flatMap(d => d.groups))).sort()]);
                 setRrgMode('ONLINE');
                 setIsRrgLoading(false);
                 setMarketError(null);
@@ -300,7 +316,7 @@ const CommandCenter = () => {
     // Filter RRG Data based on selection
     const filteredRrgData = selectedGroup === 'ALL'
         ? rrgData
-        : rrgData.filter(d => d.group === selectedGroup);
+        : rrgData.filter(d => d.groups.includes(selectedGroup));
     return (
         <div style={{ padding: '20px', backgroundColor: '#121212', minHeight: '100vh', color: 'white', fontFamily: 'Inter, sans-serif' }}>
             {/* ... Header ... */}
@@ -491,6 +507,16 @@ const CommandCenter = () => {
                             <Suspense fallback={<div>Loading RRG...</div>}>
                                 <Plot
                                     data={[
+                                        // Đuôi (trail) mỗi mã: đường mờ nối các phiên gần nhất tới điểm hiện tại
+                                        ...filteredRrgData.filter(d => d.tail.length > 1).map(d => ({
+                                            x: d.tail.map(p => p[0]),
+                                            y: d.tail.map(p => p[1]),
+                                            mode: 'lines',
+                                            line: { width: 1, color: 'rgba(255,255,255,0.35)' },
+                                            hoverinfo: 'skip',
+                                            showlegend: false,
+                                            type: 'scatter'
+                                        })),
                                         {
                                             x: filteredRrgData.map(d => d.x),
                                             y: filteredRrgData.map(d => d.y),